@@ -3,8 +3,21 @@ from scipy.integrate import solve_ivp
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from time import time
-
-class DoublePendulum:
+import integrators
+import trajectory_store
+import render
+
+class DoublePendulum(integrators.SolverMixin):
+
+    # Fixed step methods for solve, compiled kernels from integrators.py
+    _fixed_step = {"rk4": integrators.double_pendulum_rk4,
+                   "midpoint": integrators.double_pendulum_midpoint}
+    # Rows of the solution, and the quantities derived from them
+    _state_names = ("theta1", "omega1", "theta2", "omega2")
+    _derived_names = ("x1", "z1", "x2", "z2", "vx1", "vz1", "vx2", "vz2",
+                      "Potensial", "Kinetic")
+    # Coordinates of the masses from the top down, used by render.py
+    _arm_names = (("x1", "z1"), ("x2", "z2"))
 
     def __init__(self, M1=1, L1=1, M2=1, L2=1, g=9.81):
         self.M1 = M1
@@ -17,41 +30,43 @@ class DoublePendulum:
         self._theta2 = None
         self._omega1 = None
         self._omega2 = None
-        self._x1 = None
-        self._z1 = None
-        self._x2 = None
-        self._z2 = None
-        self._Potensial = None
-        self._vx1 = None
-        self._Vz1 = None
-        self._vx2 = None
-        self._vz2 = None
-        self._Kinetic = None
+        self._cache = {}
 
 
     def __call__(self, t, y):
-        """Returns a tuple on the form (omega1, theta1, omega2, theta2)"""
+        """
+        Returns an array on the form (omega1, domega1/dt, omega2, domega2/dt).
+        y can be one state (theta1, omega1, theta2, omega2) of shape (4,)
+        or k states stacked with shape (4, k), as passed by
+        solve_ivp(vectorized=True). Shared trig terms are computed once.
+        """
         M1 = self.M1
         L1 = self.L1
         M2 = self.M2
         L2 = self.L2
         g = self.g
-        dw1 = (M2 * L1 * (y[1]**2)*np.sin(y[2] - y[0]) * np.cos(y[2] - y[0])
-        + M2 * g * np.sin(y[2]) * np.cos(y[2]-y[0])
-        + M2 * L2 * (y[3]**2)*np.sin(y[2]- y[0])
-        -(M1 + M2) * g * np.sin(y[0]))
+        y = np.asarray(y)
+        delta = y[2] - y[0]
+        sin_d = np.sin(delta)
+        cos_d = np.cos(delta)
+        sin1 = np.sin(y[0])
+        sin2 = np.sin(y[2])
+        w1_sq = y[1]**2
+        w2_sq = y[3]**2
+        dw1 = (M2 * L1 * w1_sq * sin_d * cos_d
+        + M2 * g * sin2 * cos_d
+        + M2 * L2 * w2_sq * sin_d
+        - (M1 + M2) * g * sin1)
         #Next equation
-        dt1 = (M1 + M2) * L1 - M2 * L1 * (np.cos(y[2] - y[0]))**2
-        #Next equation
-        dw2 = (-M2 * L2 * (y[3]**2) * np.sin(y[2]-y[0]) * np.cos(y[2]-y[0])
-        + (M1 + M2) * g * np.sin(y[0]) * np.cos(y[2]-y[0])
-        - (M1 + M2) * L1 * (y[1]**2) * np.sin(y[2]-y[0])
-        - (M1 + M2)*g*np.sin(y[2]))
-        #Next equation
-        dt2 = (M1 + M2) * L2 - M2 * L2 * (np.cos(y[2] - y[0]))**2
-        return (y[1], dw1/dt1, y[3], dw2/dt2)
-
-    def solve(self, y0, T, dt, angle="rad"):
+        dw2 = (-M2 * L2 * w2_sq * sin_d * cos_d
+        + (M1 + M2) * g * sin1 * cos_d
+        - (M1 + M2) * L1 * w1_sq * sin_d
+        - (M1 + M2) * g * sin2)
+        #Common denominator, dt1 = L1*den and dt2 = L2*den
+        den = (M1 + M2) - M2 * cos_d**2
+        return np.array([y[1], dw1/(L1*den), y[3], dw2/(L2*den)])
+
+    def solve(self, y0, T, dt, angle="rad", method="RK45", cache=None):
         """
         Solves the coupled ODEs in the call method
         using the initial values 'y0[0] = theta(0)' and
@@ -67,40 +82,278 @@ class DoublePendulum:
         angles : string
             Keyword argument is set to 'rad', assuming input is in radians.
             If set to 'deg', it converts the input from degrees to radians.
-        Initializes t, theta1, omega1, theta2, omega2, 
+        method : string
+            'rk4' and 'midpoint' run a compiled fixed step integrator
+            with step size dt. 'midpoint' is the symplectic implicit
+            midpoint rule, which keeps the energy error bounded on long
+            runs. Any other method is passed on to solve_ivp. The RHS is
+            vectorized, so implicit methods like 'Radau' and 'BDF'
+            get their finite difference Jacobian from a single call.
+        cache : SolutionCache
+            Optional on disk cache from solution_cache.py. If the same
+            model, y0, T, dt and method were solved before, the stored
+            arrays are loaded instead of integrating again.
+        Initializes t, theta1, omega1, theta2 and omega2.
         x1, x2, z1, z2, Potensial, vx1, vz1, vx2, vz2 and Kinetic
+        are computed from them the first time they are accessed.
         x and z is cartesian coordinates of the original coordinates
         z is chosen instead of y, to not be confused with y from solve_ivp
         """
         if angle == "deg":
             y0 = np.radians(y0)
         self.dt = dt
+        self.T = T
+        self.y0 = np.array(y0, dtype=float)
+        if cache is not None:
+            key = cache.key(self, self.y0, T, dt, method)
+            if cache.fetch(self, key):
+                return
 
         n = int(T/dt)
         t = np.linspace(0, T, n)
-        sol = solve_ivp(self, (0, T), y0, t_eval=t)
-        self._t = sol.t
-        self._theta1 = sol.y[0]
-        self._theta2 = sol.y[2]
-        self._omega1 = sol.y[1]
-        self._omega2 = sol.y[3]
-        self._x1 = self.L1*np.sin(self._theta1)
-        self._z1 = -self.L1*np.cos(self._theta1)
-        self._x2 = self._x1 + self.L2*np.sin(self._theta2)
-        self._z2 = self.z1 - self.L2*np.cos(self._theta2)
-        P1 = self.M1*self.g*(self._z1 + self.L1)
-        P2 = self.M2*self.g*(self._z2 + self.L1 + self.L2)
-        self._Potensial = P1 + P2
-        self._vx1 = np.gradient(self._x1, self._t)
-        self._vz1 = np.gradient(self._z1, self._t)
-        self._vx2 = np.gradient(self._x2, self._t)
-        self._vz2 = np.gradient(self._z2, self._t)
-        K1 = 0.5*self.M1*(self._vx1**2 + self._vz1**2)
-        K2 = 0.5*self.M2*(self._vx2**2 + self._vz2**2)
-        self._Kinetic = K1 + K2
-        
+        y = self._integrate(y0, t, method)
+        self._t = t
+        self._theta1 = y[0]
+        self._theta2 = y[2]
+        self._omega1 = y[1]
+        self._omega2 = y[3]
+        self._cache = {}
+        if cache is not None:
+            cache.store(self, key)
+
+    def poincare_section(self, y0, T, chunk=10000, angle="rad", method="DOP853",
+                         rtol=1e-10, atol=1e-10):
+        """
+        Generator yielding the Poincare section theta1 = 0 (mod 2 pi)
+        with omega1 > 0, without keeping the trajectory in memory.
+        The crossings are found while integrating, by checking every
+        step of the solver and interpolating the crossing state from
+        its dense output, so only the crossings themselves are stored.
+        Does not change t, the angles or the cached quantities.
+        Parameters
+        ----------
+        y0, T and angle are as in solve.
+        chunk : int
+            Maximal number of crossings in each chunk.
+        method : string
+            A scipy.integrate OdeSolver with dense output, like 'RK45',
+            'DOP853' or 'Radau'.
+        rtol, atol : float
+            Tolerances passed on to the solver.
+
+        Yields
+        ------
+        Tuples (t, y), where t holds the crossing times of the chunk and
+        y has shape (4, len(t)) with rows (theta1, omega1, theta2, omega2).
+        """
+        if angle == "deg":
+            y0 = np.radians(y0)
+        return integrators.section_chunks(self, y0, T, chunk, method, 0, rtol, atol)
+
+    def _derived(self, theta1, omega1, theta2, omega2):
+        """
+        Computes x1, z1, x2, z2, vx1, vz1, vx2, vz2, Potensial and Kinetic
+        directly from the angles and angular velocities, with each sin and
+        cos evaluated once. The velocities are the exact time derivatives
+        of the coordinates, so no finite differences are needed.
+        Used for the stacked (N, n) arrays of solve_ensemble.
+        """
+        sin1 = np.sin(theta1)
+        cos1 = np.cos(theta1)
+        sin2 = np.sin(theta2)
+        cos2 = np.cos(theta2)
+        x1 = self.L1*sin1
+        z1 = -self.L1*cos1
+        x2 = x1 + self.L2*sin2
+        z2 = z1 - self.L2*cos2
+        P1 = self.M1*self.g*(z1 + self.L1)
+        P2 = self.M2*self.g*(z2 + self.L1 + self.L2)
+        v1 = self.L1*omega1
+        v2 = self.L2*omega2
+        vx1 = v1*cos1
+        vz1 = v1*sin1
+        vx2 = vx1 + v2*cos2
+        vz2 = vz1 + v2*sin2
+        K1 = 0.5*self.M1*v1**2
+        K2 = 0.5*self.M2*(vx2**2 + vz2**2)
+        return {"x1": x1, "z1": z1, "x2": x2, "z2": z2,
+                "vx1": vx1, "vz1": vz1, "vx2": vx2, "vz2": vz2,
+                "Potensial": P1 + P2, "Kinetic": K1 + K2}
+
+    def lyapunov(self, y0, T, dt, renorm=10, transient=0, angle="rad"):
+        """
+        Estimates the largest Lyapunov exponent by integrating the
+        tangent (variational) equations together with the state.
+        The tangent vector v is carried as the imaginary part of the
+        complex state y + i*h*v with h = 1e-20. Since the RHS is analytic,
+        calling it on the complex state gives f(y) in the real part and
+        the exact Jacobian product J(y)v times h in the imaginary part,
+        with no cancellation error. v is renormalized every renorm steps
+        and the logarithms of the growth factors are averaged.
+        Parameters
+        ----------
+        y0 : array_like
+            Initial values with shape (4,), or (4, P) for P runs at once.
+            M1, L1, M2, L2 and g may also be arrays of shape (P,), which
+            gives the exponent of P parameter sets in a single call.
+        T : (int, float)
+            The end point of the interval.
+        dt : (int, float)
+            Step size of the fixed step RK4 integrator.
+        renorm : int
+            Number of steps between each renormalization of v.
+        transient : (int, float)
+            Time before the growth factors are counted, so the
+            tangent vector can align with the most unstable direction.
+        angles : string
+            Keyword argument is set to 'rad', assuming input is in radians.
+            If set to 'deg', it converts the input from degrees to radians.
+
+        Returns
+        -------
+        The exponent as a float, or an array of shape (P,).
+        """
+        y = np.array(y0, dtype=float)
+        if angle == "deg":
+            y = np.radians(y)
+        shape = np.broadcast(y[0], self.M1, self.L1, self.M2, self.L2, self.g).shape
+        h = 1e-20
+        v = np.ones((4,) + shape)/2
+        if y.ndim == 1:
+            y = y.reshape((4,) + (1,)*len(shape))
+        z = y + 1j*h*v
+
+        steps = int(round(T/dt))
+        skip = int(round(transient/dt))
+        if renorm < 1 or (steps//renorm)*renorm <= skip:
+            print("There must be a renormalization after the transient, "
+                  "so T must be at least transient + renorm*dt")
+            raise ValueError
+        log_sum = np.zeros(shape)
+        counted = 0
+        for i in range(1, steps + 1):
+            k1 = self(0, z)
+            k2 = self(0, z + 0.5*dt*k1)
+            k3 = self(0, z + 0.5*dt*k2)
+            k4 = self(0, z + dt*k3)
+            z = z + dt/6*(k1 + 2*k2 + 2*k3 + k4)
+            if i % renorm == 0:
+                v = z.imag/h
+                norm = np.sqrt(np.sum(v**2, axis=0))
+                if i > skip:
+                    log_sum += np.log(norm)
+                    counted += renorm
+                z = z.real + 1j*h*(v/norm)
+        exponent = log_sum/(counted*dt)
+        return float(exponent) if exponent.ndim == 0 else exponent
+
+    def save(self, path, derived=False):
+        """
+        Saves t, theta1, omega1, theta2 and omega2 to path in the binary
+        format of trajectory_store.py, with M1, L1, M2, L2, g, dt, T and
+        y0 in the header. With derived=True the coordinates, velocities
+        and energies are stored as well.
+        """
+        trajectory_store.save(self, path, derived)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Returns a DoublePendulum from a file written by save, with the
+        stored solution in place as if solve had been called.
+        With mmap=True the arrays are memory mapped, so loading is
+        instant and nothing is copied before it is used.
+        """
+        return trajectory_store.load(cls, path, mmap)
+
+    def _parameters(self):
+        """The physical parameters, as keyword arguments for __init__"""
+        return {"M1": self.M1, "L1": self.L1, "M2": self.M2,
+                "L2": self.L2, "g": self.g}
+
+    def _params(self):
+        """Parameters (M1, L1, M2, L2, g) for the compiled kernels in integrators.py"""
+        return np.array([self.M1, self.L1, self.M2, self.L2, self.g], dtype=float)
+
+    def solve_ensemble(self, y0, T, dt, angle="rad", batch=None, method="RK45",
+                       rtol=1e-3, atol=1e-6):
+        """
+        Solves the coupled ODEs for many initial values at once.
+        With solve_ivp, all trajectories in a batch are stacked into one
+        state vector, so the RHS is evaluated once per step for the whole
+        batch instead of once per trajectory. Methods in _fixed_step run
+        the compiled kernel on each trajectory on its own.
+        Parameters
+        ----------
+        y0 : array_like
+            The initial values with shape (N, 4), one row
+            (theta1, omega1, theta2, omega2) per trajectory.
+        T : (int, float)
+            The end point of the interval.
+        dt : (int, float)
+            The step size.
+        angles : string
+            Keyword argument is set to 'rad', assuming input is in radians.
+            If set to 'deg', it converts the input from degrees to radians.
+        batch : int
+            Number of trajectories integrated together by solve_ivp.
+            Defaults to all N. solve_ivp controls the RMS error over the
+            whole state vector, which lets the error of one trajectory grow
+            like sqrt(batch), so rtol and atol are divided by sqrt(batch).
+            The step size then has to suit every trajectory in the batch,
+            so very chaotic ensembles run faster in smaller batches.
+        method : string
+            'rk4' or 'midpoint' run the compiled fixed step integrators
+            with step size dt, which give every trajectory the same result
+            as solve. Any other method is passed on to solve_ivp.
+        rtol, atol : float
+            Tolerances for one trajectory, as in solve_ivp.
+
+        Returns
+        -------
+        A dict with 't' of shape (n,) and 'theta1', 'omega1', 'theta2',
+        'omega2', 'x1', 'z1', 'x2', 'z2', 'Potensial' and 'Kinetic'
+        of shape (N, n).
+        """
+        y0 = np.atleast_2d(np.asarray(y0, dtype=float))
+        if y0.ndim != 2 or y0.shape[1] != 4:
+            print("y0 must have shape (N, 4)")
+            raise ValueError
+        if angle == "deg":
+            y0 = np.radians(y0)
+        self.dt = dt
+
+        N = y0.shape[0]
+        if batch is None:
+            batch = N
+        n = int(T/dt)
+        t = np.linspace(0, T, n)
+        Y = np.empty((4, N, n))
+
+        def rhs(t, y):
+            return self(t, y.reshape((4, -1) + y.shape[1:])).reshape(y.shape)
+
+        if method in self._fixed_step:
+            for i in range(N):
+                Y[:, i] = self._integrate(y0[i], t, method)
+        else:
+            for start in range(0, N, batch):
+                stop = min(start + batch, N)
+                scale = np.sqrt(stop - start)
+                sol = solve_ivp(rhs, (0, T), y0[start:stop].T.ravel(),
+                                method=method, t_eval=t, vectorized=True,
+                                rtol=rtol/scale, atol=atol/scale)
+                Y[:, start:stop] = sol.y.reshape(4, stop - start, n)
+
+        theta1, omega1, theta2, omega2 = Y
+        derived = self._derived(theta1, omega1, theta2, omega2)
+        result = {"t": t, "theta1": theta1, "omega1": omega1,
+                  "theta2": theta2, "omega2": omega2}
+        for key in ("x1", "z1", "x2", "z2", "Potensial", "Kinetic"):
+            result[key] = derived[key]
+        return result
+
 
-    
     @property
     def t(self):
         if self._t is None:
@@ -143,83 +396,45 @@ class DoublePendulum:
 
     @property
     def x1(self):
-        if self._x1 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._x1
+        return self._cached("x1", lambda: self.L1*np.sin(self.theta1))
     
     @property
     def z1(self):
-        if self._z1 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._z1
+        return self._cached("z1", lambda: -self.L1*np.cos(self.theta1))
 
     @property
     def x2(self):
-        if self._x2 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._x2
+        return self._cached("x2", lambda: self.x1 + self.L2*np.sin(self.theta2))
     
     @property
     def z2(self):
-        if self._z2 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._z2
+        return self._cached("z2", lambda: self.z1 - self.L2*np.cos(self.theta2))
     
     @property
     def Potensial(self):
-        if self._Potensial is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._Potensial
+        return self._cached("Potensial", lambda: self.g*(self.M1*(self.z1 + self.L1)
+                                        + self.M2*(self.z2 + self.L1 + self.L2)))
 
     @property
     def vx1(self):
-        if self._vx1 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._vx1
+        return self._cached("vx1", lambda: -self.omega1*self.z1)
     
     @property
     def vz1(self):
-        if self._vz1 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._vz1
+        return self._cached("vz1", lambda: self.omega1*self.x1)
     
     @property
     def vx2(self):
-        if self._vx2 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._vx2
+        return self._cached("vx2", lambda: self.vx1 - self.omega2*(self.z2 - self.z1))
 
     @property
     def vz2(self):
-        if self._vz2 is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._vz2
+        return self._cached("vz2", lambda: self.vz1 + self.omega2*(self.x2 - self.x1))
 
     @property
     def Kinetic(self):
-        if self._Kinetic is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._Kinetic
+        return self._cached("Kinetic", lambda: 0.5*(self.M1*(self.L1*self.omega1)**2
+                                            + self.M2*(self.vx2**2 + self.vz2**2)))
     
     def createAnimation(self):
 
@@ -246,8 +461,15 @@ class DoublePendulum:
         plt.show()
 
 
-    def save_animation(self, filename):
-        self.animation.save(filename, fps=1000*self.dt)
+    def save_animation(self, filename, fps=30, trace=0, workers=None):
+        """
+        Writes a movie of the solution to filename with render.render.
+        The solution is resampled to fps frames per second, which are
+        drawn in a process pool and piped to ffmpeg, so createAnimation
+        does not have to be called first. trace is the length in seconds
+        of a fading trace behind the last mass.
+        """
+        render.render(self, filename, fps, trace, workers)
 
 
 
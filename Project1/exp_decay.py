@@ -40,11 +40,60 @@ class ExponentialDecay:
         A tuple (t_, u_), where t_ is an array containing the time points,
         and u_ is an array containing the associated solution points.
         """
-        n = np.ceil(T/dt)
-        t = np.linspace(0, T, n)
+        t = self._time_points(T, dt)
         sol = solve_ivp(self, (0, T), (u0,), t_eval=t)
         return sol.t, sol.y[0]
 
+    @classmethod
+    def solve_many(cls, a, u0, T, dt, method="exact"):
+        """
+        Solves 'du/dt = -a * u' for many pairs (a, u0) at once,
+        on the same time points as solve.
+
+        Parameters
+        ----------
+        a : array_like
+            The constants, broadcast together with u0 to one dimension.
+        u0 : array_like
+            The initial values.
+        T : (int, float)
+            The end point of the interval.
+        dt : (int, float)
+            The step size.
+        method : string
+            'exact' evaluates the solution u0*exp(-a*t) directly.
+            'numerical' integrates all pairs as one diagonal system
+            with solve_ivp, which is useful for cross-checks.
+
+        Returns
+        -------
+        A tuple (t_, u_), where t_ is an array containing the time points,
+        and u_ has shape (len(a), len(t_)) with one solution per row.
+        """
+        a, u0 = np.broadcast_arrays(np.atleast_1d(np.asarray(a, dtype=float)),
+                                    np.atleast_1d(np.asarray(u0, dtype=float)))
+        if a.ndim != 1:
+            print("a and u0 must broadcast to one dimension")
+            raise ValueError
+        t = cls._time_points(T, dt)
+        if method == "exact":
+            u = np.multiply.outer(-a, t)
+            np.exp(u, out=u)
+            u *= u0[:, None]
+            return t, u
+        if method == "numerical":
+            sol = solve_ivp(lambda t, u: -a*u, (0, T), u0, t_eval=t,
+                            rtol=1e-10, atol=1e-12)
+            return sol.t, sol.y
+        print(f"Unknown method '{method}', use 'exact' or 'numerical'")
+        raise ValueError
+
+    @staticmethod
+    def _time_points(T, dt):
+        """The ceil(T/dt) time points from 0 to T used by solve and solve_many"""
+        n = int(np.ceil(T/dt))
+        return np.linspace(0, T, n)
+
 if __name__ == "__main__":
     # Example code
     decay_model = ExponentialDecay(1)
@@ -0,0 +1,109 @@
+import numpy as np
+import numba
+import matplotlib.pyplot as plt
+from double_pendulum import DoublePendulum
+import integrators
+
+#######################################
+"""
+Time to first flip of the double pendulum over a grid of
+initial angles (theta1, theta2), started from rest.
+
+Every trajectory runs in a compiled RK4 loop that stops as soon
+as either arm flips, that is when |theta1| or |theta2| passes pi.
+Starting points without enough energy to ever flip are skipped.
+The grid is cut into tiles that are spread over all cores.
+"""
+######################################
+
+
+@numba.njit(cache=True)
+def flip_time(params, theta1, theta2, dt, n):
+    """
+    Returns the first time |theta1| or |theta2| passes pi for the
+    double pendulum started at rest in (theta1, theta2), taking at
+    most n - 1 RK4 steps of size dt. Returns nan if it does not flip.
+    """
+    M1, L1, M2, L2, g = params[0], params[1], params[2], params[3], params[4]
+    # Smallest potential energy with one of the arms pointing straight up
+    flip_energy = min((M1 + M2)*g*L1 - M2*g*L2, M2*g*L2 - (M1 + M2)*g*L1)
+    energy = -(M1 + M2)*g*L1*np.cos(theta1) - M2*g*L2*np.cos(theta2)
+    if energy < flip_energy:
+        return np.nan
+
+    y = np.array([theta1, 0.0, theta2, 0.0])
+    tmp = np.empty(4)
+    k = np.empty((4, 4))
+    for i in range(1, n):
+        integrators.double_pendulum_rk4_step(params, y, dt, k, tmp)
+        if abs(y[0]) > np.pi or abs(y[2]) > np.pi:
+            return i*dt
+    return np.nan
+
+
+@numba.njit(parallel=True, cache=True)
+def _flip_tiles(params, theta1, theta2, dt, n, tiles, tile, image):
+    """Fills image[i, j] with the flip time of (theta1[j], theta2[i]) for every tile"""
+    for k in numba.prange(tiles.shape[0]):
+        i0, j0 = tiles[k, 0], tiles[k, 1]
+        for i in range(i0, min(i0 + tile, theta2.shape[0])):
+            for j in range(j0, min(j0 + tile, theta1.shape[0])):
+                image[i, j] = flip_time(params, theta1[j], theta2[i], dt, n)
+
+
+def flip_map(theta1, theta2, T, dt, pendulum=None, tile=16, outfile=None):
+    """
+    Computes the time to first flip over a grid of initial angles.
+
+    Parameters:
+
+        theta1 - 1D array of initial angles for the first arm (columns)
+
+        theta2 - 1D array of initial angles for the second arm (rows)
+
+        T - longest time to integrate each trajectory
+
+        dt - step size
+
+        pendulum - DoublePendulum with the masses and lengths to use,
+                   defaults to DoublePendulum()
+
+        tile - side length of the square tiles the grid is split into
+
+        outfile - optional file name. '.npy' files get the float image,
+                  other extensions are written as a picture with plt.imsave
+
+    Returns a float array of shape (len(theta2), len(theta1)) with
+    the flip times, nan where the pendulum does not flip before T.
+    """
+    if pendulum is None:
+        pendulum = DoublePendulum()
+    theta1 = np.asarray(theta1, dtype=float)
+    theta2 = np.asarray(theta2, dtype=float)
+    n = int(T/dt) + 1
+
+    # Neighbouring tiles cost about the same, so they are shuffled
+    # to spread expensive regions evenly over the threads
+    tiles = np.array([(i, j) for i in range(0, len(theta2), tile)
+                      for j in range(0, len(theta1), tile)])
+    tiles = tiles[np.random.default_rng(0).permutation(len(tiles))]
+
+    image = np.empty((len(theta2), len(theta1)))
+    _flip_tiles(pendulum._params(), theta1, theta2, dt, n, tiles, tile, image)
+
+    if outfile is not None:
+        if outfile.endswith(".npy"):
+            np.save(outfile, image)
+        else:
+            plt.imsave(outfile, np.log10(image), origin="lower")
+    return image
+
+
+if __name__ == "__main__":
+    angles = np.linspace(-np.pi, np.pi, 400)
+    image = flip_map(angles, angles, 30, 0.01, outfile="flip_map.png")
+    plt.imshow(np.log10(image), origin="lower", extent=(-np.pi, np.pi, -np.pi, np.pi))
+    plt.xlabel("theta1")
+    plt.ylabel("theta2")
+    plt.colorbar(label="log10 time to flip")
+    plt.show()
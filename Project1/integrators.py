@@ -0,0 +1,517 @@
+import numpy as np
+import numba
+import scipy.integrate
+import scipy.optimize
+
+#######################################
+"""
+Fixed step integrators for the pendulum models.
+The kernels are compiled with numba and all have the signature
+kernel(params, y0, dt, n), returning an array of shape (len(y0), n)
+laid out like sol.y from solve_ivp, with y0 in the first column.
+The compiled right hand sides write into a preallocated out array,
+so the stepping loops do not allocate.
+"""
+######################################
+
+
+# ------------------------------- Right hand sides ------------------------------- #
+
+@numba.njit(cache=True)
+def pendulum_rhs(y, params, out):
+    """
+    RHS of the (dampened) pendulum, y = (theta, omega).
+    params = (g/L, B/M), with B = 0 for the undampened pendulum.
+    """
+    out[0] = y[1]
+    out[1] = -params[0]*np.sin(y[0]) - params[1]*y[1]
+
+
+@numba.njit(cache=True)
+def double_pendulum_rhs(y, params, out):
+    """
+    RHS of the double pendulum, y = (theta1, omega1, theta2, omega2).
+    params = (M1, L1, M2, L2, g). Same equations as DoublePendulum.__call__.
+    """
+    M1, L1, M2, L2, g = params[0], params[1], params[2], params[3], params[4]
+    sin_d = np.sin(y[2] - y[0])
+    cos_d = np.cos(y[2] - y[0])
+    sin1 = np.sin(y[0])
+    sin2 = np.sin(y[2])
+    w1_sq = y[1]**2
+    w2_sq = y[3]**2
+    dw1 = (M2*L1*w1_sq*sin_d*cos_d + M2*g*sin2*cos_d
+           + M2*L2*w2_sq*sin_d - (M1 + M2)*g*sin1)
+    dw2 = (-M2*L2*w2_sq*sin_d*cos_d + (M1 + M2)*g*sin1*cos_d
+           - (M1 + M2)*L1*w1_sq*sin_d - (M1 + M2)*g*sin2)
+    den = (M1 + M2) - M2*cos_d**2
+    out[0] = y[1]
+    out[1] = dw1/(L1*den)
+    out[2] = y[3]
+    out[3] = dw2/(L2*den)
+
+
+@numba.njit(cache=True)
+def double_pendulum_hamilton(z, params, out):
+    """
+    Hamilton's equations of the double pendulum, z = (theta1, theta2, p1, p2)
+    with p1, p2 the canonical momenta. params = (M1, L1, M2, L2, g).
+    """
+    M1, L1, M2, L2, g = params[0], params[1], params[2], params[3], params[4]
+    delta = z[0] - z[1]
+    sin_d = np.sin(delta)
+    cos_d = np.cos(delta)
+    p1 = z[2]
+    p2 = z[3]
+    den = M1 + M2*sin_d**2
+    N = M2*L2**2*p1**2 + (M1 + M2)*L1**2*p2**2 - 2*M2*L1*L2*p1*p2*cos_d
+    C1 = p1*p2*sin_d/(L1*L2*den)
+    C2 = N*2*sin_d*cos_d/(2*L1**2*L2**2*den**2)
+    out[0] = (L2*p1 - L1*p2*cos_d)/(L1**2*L2*den)
+    out[1] = ((M1 + M2)*L1*p2 - M2*L2*p1*cos_d)/(M2*L1*L2**2*den)
+    out[2] = -(M1 + M2)*g*L1*np.sin(z[0]) - C1 + C2
+    out[3] = -M2*g*L2*np.sin(z[1]) + C1 - C2
+
+
+@numba.njit(cache=True)
+def n_pendulum_rhs(y, params, out, work):
+    """
+    RHS of a chain of N point masses on massless rods,
+    y = (theta_1, ..., theta_N, omega_1, ..., omega_N).
+    params = (g, M_1, ..., M_N, L_1, ..., L_N) and work is a
+    work array of shape (4, N).
+
+    The rod tensions T_i satisfy a tridiagonal system, found by
+    projecting the relative acceleration of the ends of each rod on
+    the rod. It is solved with the Thomas algorithm, and the angular
+    accelerations follow from the tensions, so a call is O(N) instead
+    of the O(N^3) of solving with the full mass matrix.
+    """
+    N = y.shape[0]//2
+    g = params[0]
+    c = work[0]
+    s = work[1]
+    cp = work[2]
+    T = work[3]
+    for i in range(1, N):
+        delta = y[i] - y[i - 1]
+        c[i] = np.cos(delta)
+        s[i] = np.sin(delta)
+    # Forward sweep, with T holding the modified right hand side
+    for i in range(N):
+        M = params[1 + i]
+        L = params[1 + N + i]
+        b = L*y[N + i]**2
+        diag = 1/M
+        if i == 0:
+            b += g*np.cos(y[0])
+        else:
+            sub = -c[i]/params[i]
+            diag += 1/params[i]
+            diag -= sub*cp[i - 1]
+            b -= sub*T[i - 1]
+        cp[i] = -c[i + 1]/M/diag if i < N - 1 else 0.0
+        T[i] = b/diag
+    for i in range(N - 2, -1, -1):
+        T[i] -= cp[i]*T[i + 1]
+
+    for i in range(N):
+        acc = -g*np.sin(y[0]) if i == 0 else -T[i - 1]*s[i]/params[i]
+        if i < N - 1:
+            acc += T[i + 1]*s[i + 1]/params[1 + i]
+        out[i] = y[N + i]
+        out[N + i] = acc/params[1 + N + i]
+
+
+@numba.njit(cache=True)
+def n_pendulum_field(Y, params):
+    """n_pendulum_rhs for every column of Y, shape (2N, k)"""
+    out = np.empty_like(Y)
+    work = np.zeros((4, Y.shape[0]//2))
+    y = np.empty(Y.shape[0])
+    f = np.empty(Y.shape[0])
+    for j in range(Y.shape[1]):
+        y[:] = Y[:, j]
+        n_pendulum_rhs(y, params, f, work)
+        out[:, j] = f
+    return out
+
+
+# ----------------------------------- Kernels ----------------------------------- #
+
+@numba.njit(cache=True)
+def _axpy(out, y, a, k):
+    """out = y + a*k"""
+    for j in range(y.shape[0]):
+        out[j] = y[j] + a*k[j]
+
+
+@numba.njit(cache=True)
+def _rk4_update(y, dt, k, Y, i):
+    """Combines the four RK4 stages in k into y and stores y as column i of Y"""
+    for j in range(y.shape[0]):
+        y[j] += dt/6*(k[0, j] + 2*k[1, j] + 2*k[2, j] + k[3, j])
+        Y[j, i] = y[j]
+
+
+# The RK4 kernels are written out per model, since numba can not cache
+# a kernel that takes the compiled RHS as an argument or closure.
+
+@numba.njit(cache=True)
+def pendulum_rk4(params, y0, dt, n):
+    """Classic RK4 for pendulum_rhs"""
+    Y = np.empty((y0.shape[0], n))
+    y = y0.copy()
+    tmp = np.empty_like(y)
+    k = np.empty((4, y.shape[0]))
+    Y[:, 0] = y
+    for i in range(1, n):
+        pendulum_rhs(y, params, k[0])
+        _axpy(tmp, y, 0.5*dt, k[0])
+        pendulum_rhs(tmp, params, k[1])
+        _axpy(tmp, y, 0.5*dt, k[1])
+        pendulum_rhs(tmp, params, k[2])
+        _axpy(tmp, y, dt, k[2])
+        pendulum_rhs(tmp, params, k[3])
+        _rk4_update(y, dt, k, Y, i)
+    return Y
+
+
+@numba.njit(cache=True)
+def double_pendulum_rk4_step(params, y, dt, k, tmp):
+    """Takes one RK4 step of double_pendulum_rhs in place, k and tmp are work arrays"""
+    double_pendulum_rhs(y, params, k[0])
+    _axpy(tmp, y, 0.5*dt, k[0])
+    double_pendulum_rhs(tmp, params, k[1])
+    _axpy(tmp, y, 0.5*dt, k[1])
+    double_pendulum_rhs(tmp, params, k[2])
+    _axpy(tmp, y, dt, k[2])
+    double_pendulum_rhs(tmp, params, k[3])
+    for j in range(y.shape[0]):
+        y[j] += dt/6*(k[0, j] + 2*k[1, j] + 2*k[2, j] + k[3, j])
+
+
+@numba.njit(cache=True)
+def double_pendulum_rk4(params, y0, dt, n):
+    """Classic RK4 for double_pendulum_rhs"""
+    Y = np.empty((y0.shape[0], n))
+    y = y0.copy()
+    tmp = np.empty_like(y)
+    k = np.empty((4, y.shape[0]))
+    Y[:, 0] = y
+    for i in range(1, n):
+        double_pendulum_rk4_step(params, y, dt, k, tmp)
+        Y[:, i] = y
+    return Y
+
+
+@numba.njit(cache=True)
+def n_pendulum_rk4(params, y0, dt, n):
+    """Classic RK4 for n_pendulum_rhs"""
+    Y = np.empty((y0.shape[0], n))
+    y = y0.copy()
+    tmp = np.empty_like(y)
+    k = np.empty((4, y.shape[0]))
+    work = np.zeros((4, y.shape[0]//2))
+    Y[:, 0] = y
+    for i in range(1, n):
+        n_pendulum_rhs(y, params, k[0], work)
+        _axpy(tmp, y, 0.5*dt, k[0])
+        n_pendulum_rhs(tmp, params, k[1], work)
+        _axpy(tmp, y, 0.5*dt, k[1])
+        n_pendulum_rhs(tmp, params, k[2], work)
+        _axpy(tmp, y, dt, k[2])
+        n_pendulum_rhs(tmp, params, k[3], work)
+        _rk4_update(y, dt, k, Y, i)
+    return Y
+
+
+@numba.njit(cache=True)
+def pendulum_verlet(params, y0, dt, n):
+    """
+    Velocity Verlet (leapfrog) for the pendulum, params = (g/L, B/M).
+    The damping term is taken explicitly in the first half kick and
+    implicitly in the second, which keeps the scheme symmetric and
+    second order. For B = 0 it is symplectic, so the energy error
+    stays bounded.
+    """
+    a, b = params[0], params[1]
+    damp = 1 + 0.5*dt*b
+    Y = np.empty((2, n))
+    theta = y0[0]
+    omega = y0[1]
+    Y[0, 0] = theta
+    Y[1, 0] = omega
+    for i in range(1, n):
+        omega = omega - 0.5*dt*(a*np.sin(theta) + b*omega)
+        theta = theta + dt*omega
+        omega = (omega - 0.5*dt*a*np.sin(theta))/damp
+        Y[0, i] = theta
+        Y[1, i] = omega
+    return Y
+
+
+@numba.njit(cache=True)
+def _midpoint_step(params, z, dt, f, mid, z_new):
+    """
+    Solves z_new = z + dt*F((z + z_new)/2) for one implicit midpoint step
+    of double_pendulum_hamilton by fixed point iteration.
+    Returns False if the iteration does not converge, or contracts by
+    less than a factor 10 per iteration.
+    """
+    double_pendulum_hamilton(z, params, f)
+    for j in range(4):
+        z_new[j] = z[j] + dt*f[j]
+    last = np.inf
+    for it in range(100):
+        for j in range(4):
+            mid[j] = 0.5*(z[j] + z_new[j])
+        double_pendulum_hamilton(mid, params, f)
+        err = 0.0
+        size = 1.0
+        for j in range(4):
+            z_next = z[j] + dt*f[j]
+            if not np.isfinite(z_next):
+                return False
+            err = max(err, abs(z_next - z_new[j]))
+            size = max(size, abs(z_next))
+            z_new[j] = z_next
+        if err < 1e-14*size:
+            return True
+        # The errors shrink by about dt*|F'| per iteration, a slow
+        # contraction means the step is too long to keep the energy accurate
+        if err > 0.1*last and err > 1e-12*size:
+            return False
+        last = err
+    return False
+
+
+@numba.njit(cache=True)
+def double_pendulum_midpoint(params, y0, dt, n):
+    """
+    Implicit midpoint rule for the double pendulum, params = (M1, L1, M2, L2, g).
+    The state is moved to canonical coordinates (theta1, theta2, p1, p2),
+    where the rule is symplectic, and each step is solved by fixed point
+    iteration. (theta, omega) has no explicit symplectic leapfrog,
+    since the acceleration depends on omega.
+    The fixed point iteration only converges for small enough dt*|F'|.
+    Where it converges slowly or not at all, the step is split into 2, 4, ... midpoint steps,
+    which are still symplectic, and a ValueError is raised if 1024
+    substeps are not enough.
+    """
+    M1, L1, M2, L2 = params[0], params[1], params[2], params[3]
+    Y = np.empty((4, n))
+    Y[:, 0] = y0
+    cos_d = np.cos(y0[0] - y0[2])
+    z = np.empty(4)
+    z[0] = y0[0]
+    z[1] = y0[2]
+    z[2] = (M1 + M2)*L1**2*y0[1] + M2*L1*L2*y0[3]*cos_d
+    z[3] = M2*L2**2*y0[3] + M2*L1*L2*y0[1]*cos_d
+    f = np.empty(4)
+    mid = np.empty(4)
+    z_new = np.empty(4)
+    trial = np.empty(4)
+    for i in range(1, n):
+        substeps = 1
+        while True:
+            trial[:] = z
+            converged = True
+            for k in range(substeps):
+                if not _midpoint_step(params, trial, dt/substeps, f, mid, z_new):
+                    converged = False
+                    break
+                trial[:] = z_new
+            if converged:
+                break
+            substeps *= 2
+            if substeps > 1024:
+                print("The implicit midpoint iteration did not converge, use a smaller dt")
+                raise ValueError
+        z[:] = trial
+        double_pendulum_hamilton(z, params, f)
+        Y[0, i] = z[0]
+        Y[1, i] = f[0]
+        Y[2, i] = z[1]
+        Y[3, i] = f[1]
+    return Y
+
+
+# ---------------------------------- Streaming ---------------------------------- #
+
+def time_grid(T, dt):
+    """
+    Returns (n, h) for the grid np.linspace(0, T, n) used by solve,
+    with n = int(T/dt) points and spacing h.
+    """
+    n = int(T/dt)
+    return n, T/(n - 1)
+
+
+def solve_chunks(model, y0, T, dt, chunk, method):
+    """
+    Generator solving model from y0 on the same time grid as solve,
+    yielding (t, y) with at most chunk time points at a time, where
+    y has shape (len(y0), len(t)). The integrator state is carried
+    from one chunk to the next, so memory does not grow with T.
+
+    model is a pendulum object with __call__, _fixed_step and _params.
+    Methods in model._fixed_step use the compiled kernels, any other
+    method is a scipy.integrate OdeSolver stepped one step at a time
+    and sampled with its dense output.
+    """
+    n, h = time_grid(T, dt)
+    y = np.array(y0, dtype=float)
+    if method in model._fixed_step:
+        kernel = model._fixed_step[method]
+        params = model._params()
+        start = 0
+        while start < n:
+            m = min(chunk, n - start)
+            if start == 0:
+                Y = kernel(params, y, h, m)
+            else:
+                Y = kernel(params, y, h, m + 1)[:, 1:]
+            y = Y[:, -1].copy()
+            yield h*np.arange(start, start + m), Y
+            start += m
+        return
+
+    try:
+        solver_class = getattr(scipy.integrate, method)
+    except AttributeError:
+        print(f"Unknown method '{method}'")
+        raise ValueError
+    solver = solver_class(model, 0, y, T, vectorized=True)
+    k = 0
+    while k < n:
+        m = min(chunk, n - k)
+        t = h*np.arange(k, k + m)
+        t[t > T] = T
+        Y = np.empty((len(y), m))
+        i = 0
+        while i < m:
+            if t[i] <= solver.t:
+                if solver.t_old is None:
+                    Y[:, i] = solver.y
+                    i += 1
+                    continue
+                dense = solver.dense_output()
+                j = i + np.searchsorted(t[i:], solver.t, side="right")
+                Y[:, i:j] = dense(t[i:j])
+                i = j
+            else:
+                solver.step()
+                if solver.status == "failed":
+                    print(solver.message)
+                    raise RuntimeError
+        yield t, Y
+        k += m
+
+
+def section_chunks(model, y0, T, chunk, method, index, rtol, atol):
+    """
+    Generator of the Poincare section where the angle y[index] passes a
+    multiple of 2*pi while increasing, yielding (t, y) with at most chunk
+    crossings at a time, where y has shape (len(y0), len(t)).
+
+    The scipy.integrate OdeSolver method is stepped one step at a time.
+    A step contains a crossing when sin(y[index]) changes sign from
+    negative to non negative while cos(y[index]) > 0, and the crossing
+    time is found with brentq on the dense output of that step. Only the
+    crossings are kept, so memory does not grow with T.
+    """
+    try:
+        solver_class = getattr(scipy.integrate, method)
+    except AttributeError:
+        print(f"Unknown method '{method}'")
+        raise ValueError
+    y = np.array(y0, dtype=float)
+    solver = solver_class(model, 0, y, T, vectorized=True, rtol=rtol, atol=atol)
+    t = np.empty(chunk)
+    Y = np.empty((len(y), chunk))
+    m = 0
+    s_old = np.sin(y[index])
+    while solver.status == "running":
+        solver.step()
+        if solver.status == "failed":
+            print(solver.message)
+            raise RuntimeError
+        s_new = np.sin(solver.y[index])
+        if s_old < 0 <= s_new and np.cos(solver.y[index]) > 0:
+            dense = solver.dense_output()
+            if s_new == 0:
+                t_cross = solver.t
+            else:
+                t_cross = scipy.optimize.brentq(
+                    lambda s: np.sin(dense(s)[index]), solver.t_old, solver.t,
+                    xtol=1e-14)
+            t[m] = t_cross
+            Y[:, m] = dense(t_cross)
+            m += 1
+            if m == chunk:
+                yield t.copy(), Y.copy()
+                m = 0
+        s_old = s_new
+    if m:
+        yield t[:m].copy(), Y[:, :m].copy()
+
+
+# -------------------------------- Shared methods -------------------------------- #
+
+class SolverMixin:
+    """
+    The methods Pendulum, DoublePendulum and NPendulum share for
+    integrating and for the lazily computed quantities. A model sets
+    _fixed_step, _params and _t, and solve empties _cache.
+    """
+
+    def solve_iter(self, y0, T, dt, chunk=100000, angle="rad", method="RK45"):
+        """
+        Solves the same problem as solve, but as a generator yielding
+        the solution in chunks instead of keeping it all in memory.
+        The integrator state is carried across chunks, so memory use
+        does not depend on T, and every chunk can be written straight
+        to disk, for instance with y.T.tofile(outfile).
+        Does not change t, the angles or the cached quantities.
+        Parameters
+        ----------
+        y0, T, dt, angle and method are as in solve.
+        chunk : int
+            Maximal number of time points in each chunk.
+
+        Yields
+        ------
+        Tuples (t, y), where t holds the time points of the chunk and
+        y has shape (len(y0), len(t)) with the rows in the order of y0.
+        """
+        if angle == "deg":
+            y0 = np.radians(y0)
+        return solve_chunks(self, y0, T, dt, chunk, method)
+
+    def _cached(self, name, compute):
+        """
+        Returns the derived quantity name, calling compute() the first
+        time it is accessed after solve. solve empties the cache.
+        """
+        if self._t is None:
+            print("Solve method was not called")
+            raise AttributeError
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def _integrate(self, y0, t, method):
+        """
+        Integrates from y0 over the time points t and returns the
+        solution with shape (len(y0), len(t)), like sol.y from solve_ivp.
+        Methods in _fixed_step use the compiled kernels,
+        all others are passed on to solve_ivp.
+        """
+        if method in self._fixed_step:
+            kernel = self._fixed_step[method]
+            return kernel(self._params(), np.array(y0, dtype=float),
+                          t[1] - t[0], len(t))
+        sol = scipy.integrate.solve_ivp(self, (t[0], t[-1]), y0, method=method,
+                                        t_eval=t, vectorized=True)
+        return sol.y
@@ -0,0 +1,203 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+import integrators
+import render
+
+class NPendulum(integrators.SolverMixin):
+    """
+    Class for modelling a chain of N point masses connected by massless
+    rods, hanging from a fixed point. N = 1 is the Pendulum and N = 2
+    the DoublePendulum.
+    """
+
+    # Fixed step methods for solve, compiled kernels from integrators.py
+    _fixed_step = {"rk4": integrators.n_pendulum_rk4}
+    # Coordinates of the masses from the top down, used by render.py
+    _arm_names = (("x", "z"),)
+
+    def __init__(self, N=3, M=1, L=1, g=9.81):
+        """
+        Parameters
+        ----------
+        N : int
+            Number of links.
+        M : (int, float, array_like)
+            The masses, either one value for all of them or N values
+            from the top down.
+        L : (int, float, array_like)
+            The rod lengths, like M.
+        g : (int, float)
+            The gravitational acceleration.
+        """
+        if N < 1:
+            print("N must be at least 1")
+            raise ValueError
+        self.N = N
+        self.M = np.array(np.broadcast_to(M, (N,)), dtype=float)
+        self.L = np.array(np.broadcast_to(L, (N,)), dtype=float)
+        self.g = g
+        self._t = None
+        self._theta = None
+        self._omega = None
+        self._cache = {}
+
+    def __call__(self, t, y):
+        """
+        Returns the array (omega_1, ..., omega_N, domega_1/dt, ..., domega_N/dt).
+        y can be one state (theta_1, ..., theta_N, omega_1, ..., omega_N)
+        of shape (2N,) or k states stacked with shape (2N, k), as passed
+        by solve_ivp(vectorized=True). The compiled RHS solves for the
+        rod tensions with a tridiagonal solve, so a call is O(N).
+        """
+        y = np.asarray(y, dtype=float)
+        if y.ndim == 1:
+            return integrators.n_pendulum_field(y[:, None], self._params())[:, 0]
+        return integrators.n_pendulum_field(y, self._params())
+
+    def solve(self, y0, T, dt, angle="rad", method="RK45"):
+        """
+        Solves the ODEs in the call method on the time
+        interval (0, T] with step size dt.
+        Parameters
+        ----------
+        y0 : array_like
+            The initial values (theta_1, ..., theta_N, omega_1, ..., omega_N),
+            with the angles measured from the vertical.
+        T : (int, float)
+            The end point of the interval.
+        dt : (int, float)
+            The step size.
+        angles : string
+            Keyword argument is set to 'rad', assuming input is in radians.
+            If set to 'deg', it converts the input from degrees to radians.
+        method : string
+            'rk4' runs the compiled fixed step RK4 integrator with step
+            size dt. Any other method is passed on to solve_ivp.
+        Initializes t, theta and omega, where theta and omega have shape
+        (N, len(t)) with one row per link. x, z, vx, vz, Potensial and
+        Kinetic are computed from them the first time they are accessed.
+        """
+        y0 = np.array(y0, dtype=float)
+        if y0.shape != (2*self.N,):
+            print(f"y0 must have shape ({2*self.N},)")
+            raise ValueError
+        if angle == "deg":
+            y0 = np.radians(y0)
+        self.dt = dt
+        self.T = T
+        self.y0 = y0
+
+        n = int(T/dt)
+        t = np.linspace(0, T, n)
+        y = self._integrate(y0, t, method)
+        self._t = t
+        self._theta = y[:self.N]
+        self._omega = y[self.N:]
+        self._cache = {}
+
+    def _params(self):
+        """Parameters (g, M_1, ..., M_N, L_1, ..., L_N) for the compiled kernels"""
+        return np.concatenate(([self.g], self.M, self.L))
+
+    @property
+    def t(self):
+        if self._t is None:
+            print("Solve method was not called")
+            raise AttributeError
+        else:
+            return self._t
+
+    @property
+    def theta(self):
+        if self._theta is None:
+            print("Solve method was not called")
+            raise AttributeError
+        else:
+            return self._theta
+
+    @property
+    def omega(self):
+        if self._omega is None:
+            print("Solve method was not called")
+            raise AttributeError
+        else:
+            return self._omega
+
+    @property
+    def x(self):
+        return self._cached("x", lambda: np.cumsum(self.L[:, None]*np.sin(self.theta), axis=0))
+
+    @property
+    def z(self):
+        return self._cached("z", lambda: -np.cumsum(self.L[:, None]*np.cos(self.theta), axis=0))
+
+    @property
+    def vx(self):
+        return self._cached("vx", lambda: np.cumsum(self.L[:, None]*self.omega
+                                                    *np.cos(self.theta), axis=0))
+
+    @property
+    def vz(self):
+        return self._cached("vz", lambda: np.cumsum(self.L[:, None]*self.omega
+                                                    *np.sin(self.theta), axis=0))
+
+    @property
+    def Potensial(self):
+        return self._cached("Potensial", lambda: self.g*np.sum(
+            self.M[:, None]*(self.z + np.cumsum(self.L)[:, None]), axis=0))
+
+    @property
+    def Kinetic(self):
+        return self._cached("Kinetic", lambda: 0.5*np.sum(
+            self.M[:, None]*(self.vx**2 + self.vz**2), axis=0))
+
+    def createAnimation(self):
+
+        fig = plt.figure()
+
+        plt.axis('off')
+        reach = 1.1*np.sum(self.L)
+        plt.axis((-reach, reach, -reach, reach))
+
+        self.pendulums, = plt.plot([], [], 'o-')
+        self.animation = FuncAnimation(fig, self._next_frame,
+                                        frames=range(len(self.t)),
+                                        repeat=None,
+                                        interval=1000*self.dt,
+                                        blit=True)
+
+    def _next_frame(self, i):
+        self.pendulums.set_data(np.r_[0, self.x[:, i]],
+                                np.r_[0, self.z[:, i]])
+        return self.pendulums,
+
+    def show_animation(self):
+        plt.show()
+
+    def save_animation(self, filename, fps=30, trace=0, workers=None):
+        """
+        Writes a movie of the solution to filename with render.render,
+        resampled to fps frames per second. trace is the length in
+        seconds of a fading trace behind the last mass.
+        """
+        render.render(self, filename, fps, trace, workers)
+
+
+
+def main():
+    chain = NPendulum(N=10, L=0.3)
+    chain.solve(np.r_[np.full(10, np.pi/2), np.zeros(10)], 10, 0.001, method="rk4")
+
+    plt.plot(chain.t, chain.Potensial)
+    plt.plot(chain.t, chain.Kinetic)
+    plt.plot(chain.t, chain.Kinetic + chain.Potensial)
+    plt.show()
+
+    chain.createAnimation()
+    chain.show_animation()
+
+
+if __name__ == "__main__":
+
+    main()
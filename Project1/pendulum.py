@@ -1,16 +1,29 @@
 import numpy as np
-from scipy.integrate import solve_ivp
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+import integrators
+import trajectory_store
+import render
 
-class Pendulum:
+class Pendulum(integrators.SolverMixin):
     """Class for creating a model of a pendulum"""
 
+    # Fixed step methods for solve, compiled kernels from integrators.py
+    _fixed_step = {"rk4": integrators.pendulum_rk4,
+                   "verlet": integrators.pendulum_verlet,
+                   "leapfrog": integrators.pendulum_verlet}
+    # Rows of the solution, and the quantities derived from them
+    _state_names = ("theta", "omega")
+    _derived_names = ("x", "z", "vx", "vz", "Potensial", "Kinetic")
+    # Coordinates of the masses from the top down, used by render.py
+    _arm_names = (("x", "z"),)
+
     def __init__(self, L=1, M=1, g=9.81):
         """
         Initilazing class
         On default L=1, M=1, g=9.81
         Rest of variables are created as None, to be used later.
+        Derived quantities are stored in _cache when first accessed.
         """
         self.L = L
         self.M = M
@@ -18,23 +31,21 @@ class Pendulum:
         self._t = None
         self._theta = None
         self._omega = None
-        self._x = None
-        self._z = None
-        self._Potensial = None
-        self._vx = None
-        self._vy = None
-        self._Kinetic = None
+        self._cache = {}
 
     def __call__(self, t, y):
         
         """
         Computes the RHS of the ODEs '(d theta)/dt = omega'
         and '(d omega)/dt = -(g/L)*sin(theta)', and returns
-        them as a tuple in the order given.
+        them as an array in the order given.
+        y can be one state of shape (2,) or k states stacked
+        with shape (2, k), as passed by solve_ivp(vectorized=True).
         """
-        return (y[1], -(self.g/self.L)*np.sin(y[0]))
+        y = np.asarray(y)
+        return np.array([y[1], -(self.g/self.L)*np.sin(y[0])])
 
-    def solve(self, y0, T, dt, angle="rad"):
+    def solve(self, y0, T, dt, angle="rad", method="RK45", cache=None):
         
         """
         Solves the coupled ODEs in the call method
@@ -51,33 +62,69 @@ class Pendulum:
         angles : string
             Keyword argument is set to 'rad', assuming input is in radians.
             If set to 'deg', it converts the input from degrees to radians.
-
-        Initializes t, theta, omega, x, z, Potensial, vx, vz and Kinetic
+        method : string
+            'rk4' and 'verlet' (or 'leapfrog') run a compiled fixed step
+            integrator with step size dt. Verlet keeps the energy error
+            bounded on long runs. Any other method is passed on to
+            solve_ivp. The RHS is vectorized, so implicit methods like
+            'Radau' and 'BDF' get their finite difference Jacobian
+            from a single call.
+        cache : SolutionCache
+            Optional on disk cache from solution_cache.py. If the same
+            model, y0, T, dt and method were solved before, the stored
+            arrays are loaded instead of integrating again.
+
+        Initializes t, theta and omega. x, z, Potensial, vx, vz and Kinetic
+        are computed from them the first time they are accessed.
         x and z is cartesian coordinates of the original polar coordinates
         z is chosen instead of y, to not be confused with y from solve_ivp
         """
         if angle == "deg":
-            #Fiks degrees funksjon
-            #y0
-            #TypeError: can't multiply sequence by non-int of type 'float'
-            #y0[0]
-            #TypeError: 'tuple' object does not support item assignment
-            y0 = y0 * (180/np.pi)
+            y0 = np.radians(y0)
 
         self.dt = dt
+        self.T = T
+        self.y0 = np.array(y0, dtype=float)
+        if cache is not None:
+            key = cache.key(self, self.y0, T, dt, method)
+            if cache.fetch(self, key):
+                return
         n = int(T/dt)
-        print(type(n))
         t = np.linspace(0, T, n)
-        sol = solve_ivp(self, (0, T), y0, t_eval=t)
-        self._t = sol.t
-        self._theta = sol.y[0]
-        self._omega = sol.y[1]
-        self._x = self.L*np.sin(sol.y[0])
-        self._z = -self.L*np.cos(sol.y[0])
-        self._Potensial = self.M*self.g*(self._z + self.L)
-        self._vx = np.gradient(self.L*np.cos(sol.y[0]), sol.t)
-        self._vz = np.gradient(self.L*np.sin(sol.y[0]), sol.t)
-        self._Kinetic = 0.5*self.M*(self._vx**2 + self.z**2)
+        y = self._integrate(y0, t, method)
+        self._t = t
+        self._theta = y[0]
+        self._omega = y[1]
+        self._cache = {}
+        if cache is not None:
+            cache.store(self, key)
+
+    def save(self, path, derived=False):
+        """
+        Saves t, theta and omega to path in the binary format of
+        trajectory_store.py, with L, M, g, dt, T and y0 in the header.
+        With derived=True x, z, vx, vz, Potensial and Kinetic are
+        stored as well.
+        """
+        trajectory_store.save(self, path, derived)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Returns an object of this class from a file written by save,
+        with the stored solution in place as if solve had been called.
+        With mmap=True the arrays are memory mapped, so loading is
+        instant and nothing is copied before it is used.
+        """
+        return trajectory_store.load(cls, path, mmap)
+
+    def _parameters(self):
+        """The physical parameters, as keyword arguments for __init__"""
+        return {"L": self.L, "M": self.M, "g": self.g}
+
+    def _params(self):
+        """Parameters (g/L, B/M) for the compiled kernels in integrators.py"""
+        return np.array([self.g/self.L, 0.0])
 
     #Finn en løsning på å ikke ha så mange properties
     @property
@@ -106,51 +153,32 @@ class Pendulum:
 
     @property
     def x(self):
-        if self._x is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._x
+        return self._cached("x", lambda: self.L*np.sin(self.theta))
 
     @property
     def z(self):
-        if self._z is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._z
+        return self._cached("z", lambda: -self.L*np.cos(self.theta))
 
     @property
     def Potensial(self):
-        if self._Potensial is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._Potensial
+        return self._cached("Potensial", lambda: self.M*self.g*(self.z + self.L))
     
     @property
     def vx(self):
-        if self._vx is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._vx
+        return self._cached("vx", lambda: -self.omega*self.z)
     
+    @property
+    def vz(self):
+        return self._cached("vz", lambda: self.omega*self.x)
+
     @property
     def vy(self):
-        if self._vy is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._vy
+        """Old name for vz"""
+        return self.vz
 
     @property
     def Kinetic(self):
-        if self._Kinetic is None:
-            print("Solve method was not called")
-            raise AttributeError
-        else:
-            return self._Kinetic
+        return self._cached("Kinetic", lambda: 0.5*self.M*(self.L*self.omega)**2)
 
     def createAnimation(self):
 
@@ -178,8 +206,15 @@ class Pendulum:
         plt.show()
 
 
-    def save_animation(self, filename):
-        self.animation.save(filename, fps=60)
+    def save_animation(self, filename, fps=30, trace=0, workers=None):
+        """
+        Writes a movie of the solution to filename with render.render.
+        The solution is resampled to fps frames per second, which are
+        drawn in a process pool and piped to ffmpeg, so createAnimation
+        does not have to be called first. trace is the length in seconds
+        of a fading trace behind the last mass.
+        """
+        render.render(self, filename, fps, trace, workers)
 
 class DampenedPendulum(Pendulum):
     """
@@ -192,7 +227,21 @@ class DampenedPendulum(Pendulum):
         self.B = B
 
     def __call__(self, t, y):
-        return (y[1], -(self.g/self.L)*np.sin(y[0]) - (self.B/self.M)*y[1])
+        """
+        Computes the RHS of the ODEs '(d theta)/dt = omega' and
+        '(d omega)/dt = -(g/L)*sin(theta) - (B/M)*omega'.
+        Takes states of shape (2,) or (2, k) like Pendulum.__call__.
+        """
+        y = np.asarray(y)
+        return np.array([y[1], -(self.g/self.L)*np.sin(y[0]) - (self.B/self.M)*y[1]])
+
+    def _parameters(self):
+        """The physical parameters, as keyword arguments for __init__"""
+        return {"B": self.B, "L": self.L, "M": self.M, "g": self.g}
+
+    def _params(self):
+        """Parameters (g/L, B/M) for the compiled kernels in integrators.py"""
+        return np.array([self.g/self.L, self.B/self.M])
 
     
 
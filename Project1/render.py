@@ -0,0 +1,256 @@
+import collections
+import itertools
+import multiprocessing
+import os
+import shutil
+import subprocess
+import numpy as np
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+#######################################
+"""
+Movie rendering for the pendulum models.
+
+The solution is resampled to the frame rate of the movie, so the number
+of frames depends on the length of the movie and not on dt. The frames
+are drawn with the Agg backend in a process pool, where every worker
+draws the static parts of the figure once and blits the moving artists
+on top of it. Only a few small blocks of frames are in flight at a time,
+and the raw RGBA frames are piped straight into ffmpeg.
+
+EnsembleAnimation animates many pendulums from solve_ensemble with
+one LineCollection for all the arms and one scatter for all the masses.
+"""
+######################################
+
+
+# Largest number of frames drawn by one task, which bounds the memory
+# held by finished frames waiting to be written
+_max_block = 32
+
+
+def resample(model, fps):
+    """
+    Returns (t, x, z) with the positions of the joints of a solved model
+    at the frame times t = 0, 1/fps, ... up to model.t[-1]. x and z have
+    shape (len(t), k + 1), with the fixed point of the pendulum in the
+    first column and the k masses after it, as listed in model._arm_names.
+    A name in model._arm_names may also refer to an array with one row
+    per mass, like x and z of NPendulum.
+    """
+    t = np.arange(0, model.t[-1] + 0.5/fps, 1/fps)
+    xs = np.vstack([np.atleast_2d(getattr(model, x_name))
+                    for x_name, z_name in model._arm_names])
+    zs = np.vstack([np.atleast_2d(getattr(model, z_name))
+                    for x_name, z_name in model._arm_names])
+    x = np.zeros((len(t), len(xs) + 1))
+    z = np.zeros_like(x)
+    for i in range(len(xs)):
+        x[:, i + 1] = np.interp(t, model.t, xs[i])
+        z[:, i + 1] = np.interp(t, model.t, zs[i])
+    return t, x, z
+
+
+def frames(model, fps=30, trace=0, workers=None, size=(6, 6), dpi=100):
+    """
+    Generator yielding the frames of a movie of a solved model as
+    uint8 arrays of shape (height, width, 4), in order.
+    Parameters
+    ----------
+    model : Pendulum, DampenedPendulum, DoublePendulum or NPendulum
+        A model that has been solved.
+    fps : (int, float)
+        Frames per second of the movie.
+    trace : (int, float)
+        Length in seconds of a fading trace behind the last mass.
+        0 draws no trace.
+    workers : int
+        Number of processes drawing frames. Defaults to os.cpu_count().
+        With workers=1 everything runs in this process.
+    size : tuple
+        Size of the figure in inches.
+    dpi : int
+        Dots per inch, so a frame is size*dpi pixels.
+    """
+    t, x, z = resample(model, fps)
+    reach = 1.1*max(np.max(np.hypot(x[:, -1], z[:, -1])), 1e-3)
+    length = int(round(trace*fps))
+    settings = (size, dpi, reach, length)
+    if workers is None:
+        workers = os.cpu_count()
+    block = max(1, min(-(-len(t) // (4*workers)), _max_block))
+    # Every block gets the trace history it needs from before its start
+    tasks = [(x[max(0, start - length):start + block],
+              z[max(0, start - length):start + block],
+              start - max(0, start - length), settings)
+             for start in range(0, len(t), block)]
+    if workers == 1:
+        for task in tasks:
+            yield from _draw_block(*task)
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        # At most 2*workers blocks are drawn or waiting at any time, so
+        # memory does not grow with the length of the movie
+        pending = collections.deque()
+        tasks = iter(tasks)
+        for task in itertools.islice(tasks, 2*workers):
+            pending.append(executor.submit(_draw_block, *task))
+        while pending:
+            block_frames = pending.popleft().result()
+            for task in itertools.islice(tasks, 1):
+                pending.append(executor.submit(_draw_block, *task))
+            yield from block_frames
+
+
+def render(model, filename, fps=30, trace=0, workers=None, size=(6, 6), dpi=100,
+           codec="libx264"):
+    """
+    Writes a movie of a solved model to filename with ffmpeg, which has
+    to be installed. The frames from frames are written to the stdin of
+    ffmpeg as raw RGBA, without going through matplotlib's animation
+    writers. fps, trace, workers, size and dpi are as in frames, and
+    codec is passed on to ffmpeg.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        print("ffmpeg was not found")
+        raise RuntimeError
+    width, height = int(size[0]*dpi), int(size[1]*dpi)
+    command = [ffmpeg, "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgba",
+               "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+               "-vcodec", codec, "-pix_fmt", "yuv420p", filename]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for frame in frames(model, fps, trace, workers, size, dpi):
+            process.stdin.write(frame.tobytes())
+    finally:
+        process.stdin.close()
+        process.wait()
+    if process.returncode != 0:
+        print(f"ffmpeg failed with exit code {process.returncode}")
+        raise RuntimeError
+
+
+def _draw_block(x, z, first, settings):
+    """
+    Draws the frames first, first + 1, ... of the joint positions x and z.
+    The rows before first are only used for the trace.
+    """
+    size, dpi, reach, length = settings
+    fig = Figure(figsize=size, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.axis("off")
+    ax.set_xlim(-reach, reach)
+    ax.set_ylim(-reach, reach)
+    ax.set_aspect("equal")
+    arms, = ax.plot([], [], "o-", animated=True)
+    trail = LineCollection([], color=arms.get_color(), animated=True)
+    ax.add_collection(trail)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    alpha = np.linspace(0, 1, length + 1)[1:]
+
+    result = []
+    for i in range(first, len(x)):
+        canvas.restore_region(background)
+        if length > 0 and i > 0:
+            tip = np.column_stack((x[max(0, i - length):i + 1, -1],
+                                   z[max(0, i - length):i + 1, -1]))
+            trail.set_segments(np.stack((tip[:-1], tip[1:]), axis=1))
+            trail.set_alpha(alpha[-(len(tip) - 1):])
+            ax.draw_artist(trail)
+        arms.set_data(x[i], z[i])
+        ax.draw_artist(arms)
+        result.append(np.asarray(canvas.buffer_rgba()).copy())
+    return result
+
+
+class EnsembleAnimation:
+    """
+    Animation of an ensemble of pendulums, for instance the result of
+    DoublePendulum.solve_ensemble. All arms are drawn by one LineCollection
+    and all masses by one scatter, so every frame updates two artists no
+    matter how many pendulums there are.
+    """
+
+    def __init__(self, ensemble, fps=30, arm_names=(("x1", "z1"), ("x2", "z2")),
+                 cmap="viridis"):
+        """
+        Parameters
+        ----------
+        ensemble : dict
+            Holds the time points 't' of shape (n,) and the coordinates
+            named in arm_names with shape (N, n), one row per pendulum.
+        fps : (int, float)
+            Frames per second. The coordinates are resampled to the
+            frame times, so the number of frames does not depend on dt.
+        arm_names : tuple
+            Pairs of names of the x and z coordinates of the masses,
+            from the top down.
+        cmap : string
+            Colormap used to give each pendulum its own color.
+        """
+        t = ensemble["t"]
+        self.fps = fps
+        self.cmap = cmap
+        self.t = np.arange(0, t[-1] + 0.5/fps, 1/fps)
+        # Linear interpolation of every row at once
+        right = np.clip(np.searchsorted(t, self.t), 1, len(t) - 1)
+        weight = np.clip((self.t - t[right - 1])/(t[right] - t[right - 1]), 0, 1)
+        N = len(ensemble[arm_names[0][0]])
+        # segments[i] holds the polylines of frame i, (N, k + 1, 2)
+        self.segments = np.zeros((len(self.t), N, len(arm_names) + 1, 2))
+        for j, names in enumerate(arm_names):
+            for c, name in enumerate(names):
+                a = ensemble[name]
+                rows = (1 - weight)*a[:, right - 1] + weight*a[:, right]
+                self.segments[:, :, j + 1, c] = rows.T
+        tip = self.segments[:, :, -1]
+        self.reach = 1.1*max(np.max(np.hypot(tip[..., 0], tip[..., 1])), 1e-3)
+
+    def __len__(self):
+        return len(self.t)
+
+    def createAnimation(self):
+        fig = plt.figure()
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.axis("off")
+        ax.set_xlim(-self.reach, self.reach)
+        ax.set_ylim(-self.reach, self.reach)
+        ax.set_aspect("equal")
+
+        N, k = self.segments.shape[1], self.segments.shape[2] - 1
+        colors = plt.get_cmap(self.cmap)(np.linspace(0, 1, N))
+        self.arms = LineCollection(self.segments[0], colors=colors,
+                                   linewidths=0.5, alpha=0.6)
+        ax.add_collection(self.arms)
+        self.masses = ax.scatter(*self._masses(0).T, s=4,
+                                 c=np.repeat(colors, k, axis=0))
+        self.animation = FuncAnimation(fig, self._next_frame,
+                                       frames=range(len(self)),
+                                       repeat=None,
+                                       interval=1000/self.fps,
+                                       blit=True)
+
+    def _masses(self, i):
+        """Positions of all masses in frame i, shape (N*k, 2)"""
+        return self.segments[i, :, 1:].reshape(-1, 2)
+
+    def _next_frame(self, i):
+        self.arms.set_segments(self.segments[i])
+        self.masses.set_offsets(self._masses(i))
+        return self.arms, self.masses
+
+    def show_animation(self):
+        plt.show()
+
+    def save_animation(self, filename):
+        self.animation.save(filename, fps=self.fps)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import trajectory_store
+
+#######################################
+"""
+On disk cache of solved pendulum trajectories.
+
+An entry is keyed on a hash of the model class, its physical
+parameters, y0, T, dt and the integration method, and is stored
+as a trajectory_store file named after the hash. The cache is
+bounded by max_bytes; when it grows past that the least recently
+used entries are removed, using the file modification times.
+"""
+######################################
+
+
+class SolutionCache:
+    """
+    Cache for solve on Pendulum, DampenedPendulum and DoublePendulum.
+    Pass it as solve(..., cache=cache). hits and misses count how
+    many solves were served from disk and how many were integrated.
+    """
+
+    # Age in seconds after which a temporary file of store counts as
+    # left behind by a crashed process
+    stale_seconds = 3600
+
+    def __init__(self, directory, max_bytes=2**30):
+        """
+        Parameters
+        ----------
+        directory : string
+            Where the entries are stored. Created if it does not exist.
+        max_bytes : int
+            Upper bound on the total size of the stored entries.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, model, y0, T, dt, method):
+        """Returns the hash identifying a solve call on model"""
+        cls = type(model)
+        description = {"class": f"{cls.__module__}.{cls.__qualname__}",
+                       "parameters": model._parameters(),
+                       "y0": [float(value) for value in np.ravel(y0)],
+                       "T": T, "dt": dt, "method": method}
+        text = json.dumps(description, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        """Returns the file name of the entry with the given key"""
+        return os.path.join(self.directory, key + ".traj")
+
+    def fetch(self, model, key):
+        """
+        Puts the stored solution for key into model and returns True,
+        or returns False if there is no such entry. The arrays are
+        memory mapped and read only.
+        """
+        path = self.path(key)
+        try:
+            trajectory_store.fill(model, path, mmap=True)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def store(self, model, key):
+        """Stores the solution of model under key and evicts old entries"""
+        path = self.path(key)
+        tmp = path + f".{os.getpid()}.tmp"
+        trajectory_store.save(model, tmp)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in
+        max_bytes, and temporary files left behind by crashed stores.
+        Entries another process removes at the same time are skipped.
+        """
+        self._remove_stale()
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".traj"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum(size for mtime, size, name in entries)
+        for mtime, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(name)
+            total -= size
+
+    def clear(self):
+        """Removes all entries and stale temporary files, and resets the counters"""
+        self._remove_stale()
+        for name in os.listdir(self.directory):
+            if name.endswith(".traj"):
+                self._remove(name)
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, name):
+        """Removes the file name, unless another process already did"""
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _remove_stale(self):
+        """
+        Removes the temporary files of store that are older than
+        stale_seconds. Younger ones may still be written by another process.
+        """
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                try:
+                    mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+                except FileNotFoundError:
+                    continue
+                if now - mtime > self.stale_seconds:
+                    self._remove(name)
@@ -0,0 +1,127 @@
+import itertools
+import multiprocessing
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+#######################################
+"""
+Parameter sweeps over the pendulum models.
+
+The grid points are split into batches and run on a ProcessPoolExecutor.
+Every worker writes its per-run summaries straight into one structured
+array in shared memory, so only the batch limits travel through the pipes.
+"""
+######################################
+
+def sweep(model_class, grid, T, dt, method="rk4", workers=None, batch=None):
+    """
+    Solves model_class for every point in a grid and summarizes each run.
+
+    Parameters
+    ----------
+    model_class : class
+        Pendulum, DampenedPendulum or DoublePendulum.
+    grid : dict
+        Maps names to sequences of values. The sweep runs over all
+        combinations. Names are either keyword arguments of model_class
+        (like 'L', 'B' or 'M2') or names of the initial state (like 'theta'
+        or 'omega2'). Initial values that are not in the grid are 0, and
+        parameters that are not in the grid keep their defaults.
+    T : (int, float)
+        The end point of the interval.
+    dt : (int, float)
+        The step size.
+    method : string
+        Integration method passed on to solve.
+    workers : int
+        Number of processes. Defaults to os.cpu_count(). With workers=1
+        everything runs in this process.
+    batch : int
+        Number of grid points per task. Defaults to splitting the grid
+        into about 8 tasks per worker, which balances the load without
+        much overhead per task.
+
+    Returns
+    -------
+    A structured array with one row per grid point. It has a field for
+    every name in grid, and the fields 'drift' (largest deviation of the
+    total energy from its initial value), 'flip_time' (first time any
+    angle passes pi in absolute value, nan if it never does) and 'final'
+    (the state at time T).
+    """
+    names = list(grid)
+    state_names = model_class._state_names
+    dtype = np.dtype([(name, float) for name in names]
+                     + [("drift", float), ("flip_time", float),
+                        ("final", float, (len(state_names),))])
+    points = list(itertools.product(*(grid[name] for name in names)))
+    n = len(points)
+    if workers is None:
+        workers = os.cpu_count()
+    if batch is None:
+        batch = max(1, -(-n // (8*workers)))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n*dtype.itemsize))
+    try:
+        result = np.ndarray(n, dtype=dtype, buffer=shm.buf)
+        for i, name in enumerate(names):
+            result[name] = [point[i] for point in points]
+
+        tasks = [(shm.name, dtype, n, start, min(start + batch, n),
+                  model_class, names, T, dt, method)
+                 for start in range(0, n, batch)]
+        if workers == 1:
+            for task in tasks:
+                _run_batch(*task)
+        else:
+            # Forking after numba has started its thread pool (for instance
+            # in flip_map) can deadlock the workers, so they are spawned.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context) as executor:
+                for future in [executor.submit(_run_batch, *task) for task in tasks]:
+                    future.result()
+        summary = result.copy()
+        del result
+    finally:
+        shm.close()
+        shm.unlink()
+    return summary
+
+
+def summarize(model):
+    """
+    Returns (drift, flip_time, final) for a solved pendulum model,
+    as described in sweep.
+    """
+    energy = model.Kinetic + model.Potensial
+    drift = np.max(np.abs(energy - energy[0]))
+    angles = [getattr(model, name) for name in model._state_names
+              if name.startswith("theta")]
+    flipped = np.any(np.abs(angles) > np.pi, axis=0)
+    flip_time = model.t[np.argmax(flipped)] if flipped.any() else np.nan
+    final = [getattr(model, name)[-1] for name in model._state_names]
+    return drift, flip_time, final
+
+
+def _run_batch(shm_name, dtype, n, start, stop, model_class, names, T, dt, method):
+    """Runs the grid points start to stop and writes their rows into shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        result = np.ndarray(n, dtype=dtype, buffer=shm.buf)
+        state_names = model_class._state_names
+        for i in range(start, stop):
+            parameters = {name: result[name][i] for name in names
+                          if name not in state_names}
+            y0 = [result[name][i] if name in names else 0.0
+                  for name in state_names]
+            model = model_class(**parameters)
+            model.solve(y0, T, dt, method=method)
+            drift, flip_time, final = summarize(model)
+            result["drift"][i] = drift
+            result["flip_time"][i] = flip_time
+            result["final"][i] = final
+        del result
+    finally:
+        shm.close()
@@ -1,5 +1,6 @@
 from double_pendulum import DoublePendulum
 import numpy as np
+from scipy.integrate import solve_ivp
 
 def test_double_pendulum():
     example = DoublePendulum(L1=2.7, L2=2.7)
@@ -72,4 +73,129 @@ def test_double_pendulum_properties():
         success = True
     assert success
 
-    
\ No newline at end of file
+    
+def test_solve_ensemble():
+    """
+    Tests weather solve_ensemble gives the same trajectories as
+    solving each initial value on its own, and that the arrays
+    are stacked with shape (N, n).
+    """
+    y0 = np.array([(np.pi/4, 0, np.pi/2, 0),
+                   (0.1, 0.2, -0.1, 0),
+                   (0, 0, 0, 0)])
+    Object = DoublePendulum()
+    result = Object.solve_ensemble(y0, 2, 0.01, batch=2)
+    n = len(result["t"])
+    assert result["theta1"].shape == (3, n)
+    assert result["Kinetic"].shape == (3, n)
+
+    tol = 1e-2
+    for i in range(3):
+        Object.solve(y0[i], 2, 0.01)
+        assert np.max(abs(result["theta1"][i] - Object.theta1)) < tol
+        assert np.max(abs(result["theta2"][i] - Object.theta2)) < tol
+
+def test_solve_ensemble_independent():
+    """
+    Tests weather a trajectory from solve_ensemble stays as accurate
+    when more members are added to the ensemble, and that the fixed
+    step methods give exactly the result of solve.
+    """
+    y = np.array([0.8, 0, 1.0, 0])
+    T, dt = 10, 0.01
+    Object = DoublePendulum()
+    t = np.linspace(0, T, int(T/dt))
+    reference = solve_ivp(Object, (0, T), y, method="DOP853", t_eval=t,
+                          rtol=1e-12, atol=1e-12).y[0]
+
+    alone = Object.solve_ensemble(y[None], T, dt)
+    error = np.max(abs(alone["theta1"][0] - reference))
+    for N in (10, 1000):
+        y0 = np.zeros((N, 4))
+        y0[0] = y
+        result = Object.solve_ensemble(y0, T, dt)
+        assert np.max(abs(result["theta1"][0] - reference)) <= 1.5*error
+
+    y0 = np.random.default_rng(0).uniform(-2, 2, (10, 4))
+    y0[0] = y
+    result = Object.solve_ensemble(y0, T, dt, method="rk4")
+    Object.solve(y, T, dt, method="rk4")
+    assert np.array_equal(result["theta1"][0], Object.theta1)
+
+def test_double_pendulum_vectorized():
+    """
+    Tests weather calling with a (4, k) stack of states gives
+    the same columns as calling with each state on its own.
+    """
+    example = DoublePendulum(L1=2.7, L2=1.5, M2=2)
+    y = np.array([(np.pi/2, 0.1, np.pi/4, 0.2),
+                  (0.3, -1, 2, 0.5),
+                  (0, 0, 0, 0)]).T
+    computed = example(0, y)
+    assert computed.shape == (4, 3)
+    tol = 1e-14
+    for k in range(3):
+        expected = example(0, y[:, k])
+        assert np.max(abs(computed[:, k] - expected)) < tol
+
+def test_double_pendulum_energy():
+    """
+    Tests weather the velocities are the time derivatives of the
+    coordinates, and that the total energy is conserved.
+    """
+    Object = DoublePendulum(M1=1, L1=2.7, M2=2, L2=1.5)
+    Object.solve((np.pi/2, 0, np.pi/4, 1), 5, 0.0005, method="rk4")
+    assert np.max(abs(Object.vx2 - np.gradient(Object.x2, Object.t))[1:-1]) < 1e-4
+    assert np.max(abs(Object.vz1 - np.gradient(Object.z1, Object.t))[1:-1]) < 1e-4
+    E = Object.Kinetic + Object.Potensial
+    assert np.max(abs(E - E[0])) < 1e-6
+
+def test_lyapunov():
+    """
+    Tests weather small oscillations give an exponent close to zero,
+    a chaotic start gives a clearly positive one, and that a batch of
+    parameter sets gives the same exponents as one call per set.
+    """
+    Object = DoublePendulum()
+    assert abs(Object.lyapunov((0.05, 0, 0.05, 0), 50, 0.01, transient=5)) < 0.05
+    assert Object.lyapunov((2, 0, 2.5, 0), 50, 0.01, transient=5) > 0.5
+
+    Batch = DoublePendulum(L2=np.array([0.5, 2]))
+    computed = Batch.lyapunov((2, 0, 2.5, 0), 20, 0.01)
+    assert computed.shape == (2,)
+    for i, L2 in enumerate((0.5, 2)):
+        expected = DoublePendulum(L2=L2).lyapunov((2, 0, 2.5, 0), 20, 0.01)
+        assert abs(computed[i] - expected) < 1e-12
+
+    for T, dt, transient in ((1, 0.01, 2), (0.05, 0.01, 0), (0.99, 0.01, 0.95)):
+        success = False
+        try:
+            Object.lyapunov((1, 0, 1, 0), T, dt, transient=transient)
+        except ValueError:
+            success = True
+        assert success
+
+def test_poincare_section():
+    """
+    Tests weather the streamed Poincare section gives the same crossings
+    as event detection in solve_ivp, independent of the chunk size.
+    """
+    Object = DoublePendulum()
+    y0 = (0.3, 0, 1.2, 0)
+    chunks = list(Object.poincare_section(y0, 100, chunk=7))
+    assert all(len(t) <= 7 for t, y in chunks)
+    t = np.concatenate([t for t, y in chunks])
+    y = np.concatenate([y for t, y in chunks], axis=1)
+    assert np.all(np.diff(t) > 0)
+    assert np.max(abs(np.sin(y[0]))) < 1e-9
+    assert np.all(y[1] > 0)
+
+    def event(t, y):
+        return y[0]
+    event.direction = 1
+    sol = solve_ivp(Object, (0, 100), y0, method="DOP853", events=event,
+                    rtol=1e-10, atol=1e-10)
+    expected = sol.t_events[0]
+    assert len(t) == len(expected)
+    assert np.max(abs(t - expected)) < 1e-6
+    assert np.max(abs(y.T - sol.y_events[0])) < 1e-5
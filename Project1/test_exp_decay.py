@@ -1,4 +1,5 @@
 from exp_decay import ExponentialDecay
+import numpy as np
 
 
 def test_exp_decay():
@@ -7,3 +8,29 @@ def test_exp_decay():
     computed = decay_model(0, 3.2)
     expected = -1.28
     assert abs(expected - computed) < 1e-14
+
+
+def test_exp_decay_solve():
+    """Tests weather solve runs with a float step count and matches the exact solution."""
+    decay_model = ExponentialDecay(0.4)
+    t, u = decay_model.solve(3.2, 10, 0.1)
+    assert len(t) == 100
+    assert np.max(abs(u - 3.2*np.exp(-0.4*t))) < 1e-2
+
+
+def test_exp_decay_solve_many():
+    """Tests weather the exact and numerical batched solutions agree with solve."""
+    a = np.array([0.1, 0.4, 2.0])
+    u0 = np.array([1.0, 3.2, -0.5])
+    t, exact = ExponentialDecay.solve_many(a, u0, 5, 0.01)
+    assert exact.shape == (3, len(t))
+    assert np.allclose(exact[:, 0], u0)
+    t_num, numerical = ExponentialDecay.solve_many(a, u0, 5, 0.01, method="numerical")
+    assert np.array_equal(t, t_num)
+    assert np.max(abs(exact - numerical)) < 1e-8
+    t_one, u_one = ExponentialDecay(0.4).solve(3.2, 5, 0.01)
+    assert np.max(abs(exact[1] - u_one)) < 1e-2
+
+    t, broadcast = ExponentialDecay.solve_many(a, 2.0, 1, 0.5)
+    assert broadcast.shape == (3, 2)
+    assert np.allclose(broadcast[:, -1], 2.0*np.exp(-a))
@@ -0,0 +1,24 @@
+from double_pendulum import DoublePendulum
+from flip_map import flip_map
+import numpy as np
+
+def test_flip_map():
+    """
+    Tests weather the flip map agrees with the first flip found from a
+    full solve, and that low energy starting points never flip.
+    """
+    theta1 = np.array([0.1, 2.5, 3.0])
+    theta2 = np.array([0.2, 3.0])
+    image = flip_map(theta1, theta2, 5, 0.001, tile=1)
+    assert image.shape == (2, 3)
+    assert np.isnan(image[0, 0])
+
+    Object = DoublePendulum()
+    for i in range(2):
+        for j in range(3):
+            Object.solve((theta1[j], 0, theta2[i], 0), 5, 0.001, method="rk4")
+            flipped = (abs(Object.theta1) > np.pi) | (abs(Object.theta2) > np.pi)
+            if flipped.any():
+                assert abs(image[i, j] - Object.t[np.argmax(flipped)]) < 0.01
+            else:
+                assert np.isnan(image[i, j])
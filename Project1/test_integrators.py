@@ -0,0 +1,76 @@
+from pendulum import Pendulum, DampenedPendulum
+from double_pendulum import DoublePendulum
+import numpy as np
+from scipy.integrate import solve_ivp
+
+def test_fixed_step_matches_solve_ivp():
+    """
+    Tests weather the compiled fixed step methods give the same
+    trajectory as solve_ivp with a tight tolerance.
+    """
+    tol = 1e-5
+    Object = DampenedPendulum(0.3, L=2.7)
+    t = np.linspace(0, 5, 5000)
+    expected = solve_ivp(Object, (0, 5), (np.pi/2, 2), t_eval=t,
+                         rtol=1e-12, atol=1e-12).y[0]
+    for method in ("rk4", "verlet"):
+        Object.solve((np.pi/2, 2), 5, 0.001, method=method)
+        assert len(Object.t) == len(t)
+        assert np.max(abs(Object.theta - expected)) < tol
+
+    Object = DoublePendulum(L1=2.7, L2=2.7)
+    t = np.linspace(0, 2, 4000)
+    expected = solve_ivp(Object, (0, 2), (np.pi/4, 0, np.pi/2, 0), t_eval=t,
+                         rtol=1e-12, atol=1e-12).y[2]
+    for method in ("rk4", "midpoint"):
+        Object.solve((np.pi/4, 0, np.pi/2, 0), 2, 0.0005, method=method)
+        assert np.max(abs(Object.theta2 - expected)) < tol
+
+def test_symplectic_energy_bounded():
+    """
+    Tests weather the energy error of the symplectic methods stays
+    small over a long run with a coarse step size.
+    """
+    Object = Pendulum(L=1)
+    Object.solve((2.5, 0), 1000, 0.01, method="verlet")
+    E = 0.5*Object.omega**2 - Object.g*np.cos(Object.theta)
+    assert np.max(abs(E - E[0])) < 0.1
+
+    Object = DoublePendulum()
+    Object.solve((np.pi/2, 0, np.pi/2, 0), 200, 0.002, method="midpoint")
+    th1, w1, th2, w2 = Object.theta1, Object.omega1, Object.theta2, Object.omega2
+    g = Object.g
+    E = (w1**2 + 0.5*w2**2 + w1*w2*np.cos(th1 - th2)
+         - 2*g*np.cos(th1) - g*np.cos(th2))
+    assert np.max(abs(E - E[0])) < 0.1
+
+def test_midpoint_large_steps():
+    """
+    Tests weather the midpoint rule splits steps that are too long for
+    the fixed point iteration, instead of accepting unconverged steps,
+    so the energy stays finite and close to the start value.
+    """
+    Object = DoublePendulum()
+    for dt in (0.05, 0.1, 0.3):
+        Object.solve((3, 0, 3, 0), 20, dt, method="midpoint")
+        E = Object.Kinetic + Object.Potensial
+        assert np.all(np.isfinite(E))
+        assert np.max(abs(E - E[0])) < 1
+
+def test_solve_iter_matches_solve():
+    """
+    Tests weather gluing the chunks from solve_iter together gives
+    the same time points and solution as solve, for both the compiled
+    kernels and the solve_ivp methods.
+    """
+    for method in ("rk4", "RK45"):
+        Object = Pendulum(2)
+        Object.solve((np.pi/2, 0), 3, 0.01, method=method)
+        chunks = list(Object.solve_iter((np.pi/2, 0), 3, 0.01, chunk=37,
+                                        method=method))
+        assert max(len(t) for t, y in chunks) == 37
+        t = np.concatenate([t for t, y in chunks])
+        y = np.concatenate([y for t, y in chunks], axis=1)
+        assert np.max(abs(t - Object.t)) < 1e-12
+        assert np.max(abs(y[0] - Object.theta)) < 1e-12
+        assert np.max(abs(y[1] - Object.omega)) < 1e-12
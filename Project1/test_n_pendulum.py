@@ -0,0 +1,58 @@
+from n_pendulum import NPendulum
+from pendulum import Pendulum
+from double_pendulum import DoublePendulum
+import numpy as np
+import render
+
+def test_n_pendulum_matches_double_pendulum():
+    """
+    Tests weather a chain of one or two links gives the same right hand
+    side and trajectory as Pendulum and DoublePendulum.
+    """
+    assert np.allclose(NPendulum(N=1, L=2.7)(0, (0.7, 0.3)),
+                       Pendulum(L=2.7)(0, (0.7, 0.3)))
+
+    Object = NPendulum(N=2, M=(1, 2), L=(2.7, 1.5))
+    Double = DoublePendulum(M1=1, L1=2.7, M2=2, L2=1.5)
+    y = np.random.default_rng(1).normal(size=(4, 5))
+    assert np.allclose(Object(0, y), Double(0, y[[0, 2, 1, 3]])[[0, 2, 1, 3]])
+
+    Object.solve((np.pi/4, np.pi/2, 0, 0), 2, 0.001, method="rk4")
+    Double.solve((np.pi/4, 0, np.pi/2, 0), 2, 0.001, method="rk4")
+    assert np.max(abs(Object.theta[1] - Double.theta2)) < 1e-10
+    assert np.allclose(Object.x[1], Double.x2)
+    assert np.allclose(Object.z[1], Double.z2)
+    assert np.allclose(Object.Kinetic, Double.Kinetic)
+    assert np.allclose(Object.Potensial, Double.Potensial)
+
+def test_n_pendulum_solve_iter():
+    """
+    Tests weather the chunks from solve_iter, shared with Pendulum and
+    DoublePendulum, glue together to the solution of solve.
+    """
+    Object = NPendulum(N=3)
+    y0 = (0.5, 1, 1.5, 0, 0, 0)
+    chunks = list(Object.solve_iter(y0, 1, 0.001, chunk=300, method="rk4"))
+    Object.solve(y0, 1, 0.001, method="rk4")
+    t = np.concatenate([t for t, y in chunks])
+    y = np.concatenate([y for t, y in chunks], axis=1)
+    assert np.allclose(t, Object.t)
+    assert np.allclose(y[:3], Object.theta)
+
+def test_n_pendulum_energy():
+    """
+    Tests weather a long chain conserves energy and that its velocities
+    are the time derivatives of its coordinates.
+    """
+    N = 20
+    Object = NPendulum(N=N, M=np.linspace(1, 2, N), L=0.1)
+    y0 = np.r_[np.linspace(0.5, 1.5, N), np.zeros(N)]
+    Object.solve(y0, 2, 0.0005, method="rk4")
+    E = Object.Kinetic + Object.Potensial
+    assert np.max(abs(E - E[0])) < 1e-5*abs(E[0])
+    assert np.max(abs(np.gradient(Object.x, Object.t, axis=1)[:, 1:-1]
+                      - Object.vx[:, 1:-1])) < 1e-3
+
+    t, x, z = render.resample(Object, 10)
+    assert x.shape == (21, N + 1)
+    assert np.allclose(x[-1, 1:], Object.x[:, -1])
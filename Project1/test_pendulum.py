@@ -1,4 +1,4 @@
-from pendulum import Pendulum
+from pendulum import Pendulum, DampenedPendulum
 import numpy as np
 
 def test_pendulum():
@@ -80,3 +80,59 @@ def test_pendulum_properties():
 
     
 
+
+def test_pendulum_vectorized():
+    """
+    Tests weather calling with a (2, k) stack of states gives
+    the same columns as calling with each state on its own,
+    and that the RHS works with implicit solve_ivp methods.
+    """
+    Object = DampenedPendulum(0.3, L=2.7)
+    y = np.array([(np.pi/6, 0), (1, 2), (-0.5, 0.1)]).T
+    computed = Object(0, y)
+    assert computed.shape == (2, 3)
+    for k in range(3):
+        assert np.max(abs(computed[:, k] - Object(0, y[:, k]))) < 1e-14
+
+    Object.solve((np.pi/6, 0), 1, 0.01, method="Radau")
+    assert abs(Object.theta[0] - np.pi/6) < 1e-14
+
+def test_pendulum_energy():
+    """
+    Tests weather the velocities are the time derivatives of x and z,
+    and that the total energy is conserved for the undampened pendulum.
+    """
+    Object = Pendulum(2.7, M=2)
+    Object.solve((np.pi/2, 1), 5, 0.001, method="rk4")
+    assert np.max(abs(Object.vx - np.gradient(Object.x, Object.t))[1:-1]) < 1e-4
+    assert np.max(abs(Object.vz - np.gradient(Object.z, Object.t))[1:-1]) < 1e-4
+    E = Object.Kinetic + Object.Potensial
+    assert np.max(abs(E - E[0])) < 1e-8
+
+def test_pendulum_lazy_properties():
+    """
+    Tests weather derived quantities are only computed when accessed,
+    and that a new solve replaces the cached values.
+    """
+    Object = Pendulum(2)
+    Object.solve((np.pi/2, 0), 1, 0.01)
+    assert Object._cache == {}
+    x = Object.x
+    assert Object.x is x
+    Object.solve((np.pi/4, 0), 1, 0.01)
+    assert "x" not in Object._cache
+    assert abs(Object.x[0] - 2*np.sin(np.pi/4)) < 1e-14
+
+def test_pendulum_degrees():
+    """
+    Tests weather solve and solve_iter both accept a tuple in degrees
+    and give the same solution as the same start in radians.
+    """
+    Object = Pendulum(2)
+    Object.solve((np.pi/3, np.pi/6), 1, 0.01, method="rk4")
+    expected = Object.theta
+    Object.solve((60, 30), 1, 0.01, angle="deg", method="rk4")
+    assert np.allclose(Object.theta, expected)
+    assert np.allclose(Object.y0, (np.pi/3, np.pi/6))
+    t, y = next(Object.solve_iter((60, 30), 1, 0.01, angle="deg", method="rk4"))
+    assert np.allclose(y[0], expected)
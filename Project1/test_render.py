@@ -0,0 +1,71 @@
+from pendulum import Pendulum
+from double_pendulum import DoublePendulum
+import numpy as np
+import render
+
+def test_resample():
+    """
+    Tests weather the solution is resampled to one frame per 1/fps
+    seconds, with the fixed point first and the masses after it.
+    """
+    Object = DoublePendulum()
+    Object.solve((1, 0, 2, 0), 2, 0.001, method="rk4")
+    t, x, z = render.resample(Object, 25)
+    assert len(t) == 51
+    assert x.shape == z.shape == (51, 3)
+    assert np.all(x[:, 0] == 0) and np.all(z[:, 0] == 0)
+    assert abs(x[-1, 2] - Object.x2[-1]) < 1e-12
+    assert np.max(abs(np.hypot(x[:, 1], z[:, 1]) - Object.L1)) < 1e-3
+
+def test_frames():
+    """
+    Tests weather the frames have the right size and number, and that
+    drawing them in several processes gives the same frames as drawing
+    them in one.
+    """
+    Object = Pendulum(L=2)
+    Object.solve((1, 0), 1, 0.001, method="verlet")
+    expected = list(render.frames(Object, 20, trace=0.3, workers=1,
+                                  size=(2, 1.5), dpi=50))
+    assert len(expected) == 21
+    assert expected[0].shape == (75, 100, 4)
+    assert expected[0].dtype == np.uint8
+    assert not np.array_equal(expected[0], expected[-1])
+    computed = list(render.frames(Object, 20, trace=0.3, workers=2,
+                                  size=(2, 1.5), dpi=50))
+    assert all(np.array_equal(a, b) for a, b in zip(expected, computed))
+
+def test_frames_small_blocks(monkeypatch):
+    """
+    Tests weather the frames come out complete and in order when there
+    are many more blocks than can be in flight at once.
+    """
+    Object = Pendulum(L=2)
+    Object.solve((1, 0), 2, 0.001, method="verlet")
+    expected = list(render.frames(Object, 20, trace=0.3, workers=1,
+                                  size=(2, 1.5), dpi=50))
+    monkeypatch.setattr(render, "_max_block", 2)
+    computed = list(render.frames(Object, 20, trace=0.3, workers=2,
+                                  size=(2, 1.5), dpi=50))
+    assert len(computed) == len(expected) == 41
+    assert all(np.array_equal(a, b) for a, b in zip(expected, computed))
+
+def test_ensemble_animation():
+    """
+    Tests weather the ensemble animation resamples every pendulum to the
+    frame times and draws them all with one collection and one scatter.
+    """
+    Object = DoublePendulum()
+    y0 = [(1, 0, 2 + 1e-3*i, 0) for i in range(5)]
+    result = Object.solve_ensemble(y0, 2, 0.01)
+    Animation = render.EnsembleAnimation(result, fps=10)
+    assert len(Animation) == 21
+    Animation.createAnimation()
+    arms, masses = Animation._next_frame(20)
+    segments = arms.get_segments()
+    assert len(segments) == 5
+    for i in range(5):
+        assert np.allclose(segments[i][0], (0, 0))
+        assert np.allclose(segments[i][2], (result["x2"][i, -1], result["z2"][i, -1]))
+    assert masses.get_offsets().shape == (10, 2)
+    assert np.allclose(masses.get_offsets()[1], (result["x2"][0, -1], result["z2"][0, -1]))
@@ -0,0 +1,68 @@
+from pendulum import Pendulum, DampenedPendulum
+from double_pendulum import DoublePendulum
+from solution_cache import SolutionCache
+import numpy as np
+import os
+
+def test_cache_hits_and_misses(tmp_path):
+    """
+    Tests weather a repeated solve is served from the cache with the
+    same arrays, and that a change in parameters, y0 or class misses.
+    """
+    cache = SolutionCache(tmp_path)
+    Object = DoublePendulum(L1=2)
+    Object.solve((1, 0, 2, 0), 2, 0.01, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    Object2 = DoublePendulum(L1=2)
+    Object2.solve((1, 0, 2, 0), 2, 0.01, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.all(Object2.theta2 == Object.theta2)
+    assert np.all(Object2.Kinetic == Object.Kinetic)
+
+    DoublePendulum(L1=3).solve((1, 0, 2, 0), 2, 0.01, cache=cache)
+    DoublePendulum(L1=2).solve((1, 0, 2.1, 0), 2, 0.01, cache=cache)
+    Pendulum(2).solve((1, 0), 2, 0.01, cache=cache)
+    DampenedPendulum(0, L=2).solve((1, 0), 2, 0.01, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 5)
+
+def test_cache_eviction(tmp_path):
+    """
+    Tests weather the least recently used entry is evicted first
+    when the cache grows past max_bytes.
+    """
+    cache = SolutionCache(tmp_path, max_bytes=10000)
+    Object = Pendulum()
+    Object.solve((1, 0), 2, 0.01, cache=cache)
+    os.utime(cache.path(cache.key(Object, Object.y0, 2, 0.01, "RK45")), (0, 0))
+    Object.solve((2, 0), 2, 0.01, cache=cache)
+    Object.solve((3, 0), 2, 0.01, cache=cache)
+    assert len(os.listdir(tmp_path)) == 2
+
+    Object.solve((1, 0), 2, 0.01, cache=cache)
+    assert cache.hits == 0
+    Object.solve((3, 0), 2, 0.01, cache=cache)
+    assert cache.hits == 1
+
+def test_cache_concurrent_removal(tmp_path, monkeypatch):
+    """
+    Tests weather evict and clear skip entries another process removed
+    after they were listed, and remove only stale temporary files.
+    """
+    cache = SolutionCache(tmp_path, max_bytes=0)
+    Object = Pendulum()
+    Object.solve((1, 0), 2, 0.01, cache=cache)
+    old = tmp_path / "old.traj.1.tmp"
+    new = tmp_path / "new.traj.2.tmp"
+    old.write_bytes(b"")
+    new.write_bytes(b"")
+    os.utime(old, (0, 0))
+
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listdir(path) + ["gone.traj", "gone.tmp"])
+    Object.solve((2, 0), 2, 0.01, cache=cache)
+    assert not old.exists()
+    assert new.exists()
+    cache.clear()
+    monkeypatch.undo()
+    assert os.listdir(tmp_path) == ["new.traj.2.tmp"]
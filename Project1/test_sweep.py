@@ -0,0 +1,32 @@
+from pendulum import DampenedPendulum
+from double_pendulum import DoublePendulum
+from sweep import sweep, summarize
+import numpy as np
+
+def test_sweep_double_pendulum():
+    """
+    Tests weather the sweep runs every grid combination, and that a row
+    computed by the worker processes is the same as solving directly.
+    """
+    grid = {"L2": [0.5, 1], "theta1": [0.1, 1, 3], "omega2": [0, 5]}
+    result = sweep(DoublePendulum, grid, 2, 0.01, workers=2, batch=5)
+    assert len(result) == 12
+    assert set(zip(result["L2"], result["theta1"], result["omega2"])) == \
+        {(a, b, c) for a in grid["L2"] for b in grid["theta1"] for c in grid["omega2"]}
+
+    row = result[7]
+    Object = DoublePendulum(L2=row["L2"])
+    Object.solve((row["theta1"], 0, 0, row["omega2"]), 2, 0.01, method="rk4")
+    drift, flip_time, final = summarize(Object)
+    assert row["drift"] == drift
+    assert np.all(row["final"] == final)
+    assert (np.isnan(row["flip_time"]) and np.isnan(flip_time)) or row["flip_time"] == flip_time
+
+def test_sweep_flip_time():
+    """
+    Tests weather a pendulum started fast enough to go over the top gets
+    a flip time, and that a slow one does not.
+    """
+    result = sweep(DampenedPendulum, {"B": [0.1], "omega": [1, 10]}, 2, 0.01, workers=1)
+    assert np.isnan(result["flip_time"][0])
+    assert 0 < result["flip_time"][1] < 2
@@ -0,0 +1,44 @@
+from pendulum import DampenedPendulum
+from double_pendulum import DoublePendulum
+import numpy as np
+
+def test_save_load_double_pendulum(tmp_path):
+    """
+    Tests weather a saved DoublePendulum is loaded back with the same
+    parameters, header values and arrays, both memory mapped and not.
+    """
+    path = tmp_path / "run.traj"
+    Object = DoublePendulum(M1=2, L1=1.5, M2=1, L2=0.5)
+    Object.solve((np.pi/2, 0, np.pi/4, 1), 2, 0.01, method="rk4")
+    Object.save(path, derived=True)
+
+    for mmap in (True, False):
+        Loaded = DoublePendulum.load(path, mmap=mmap)
+        assert (Loaded.M1, Loaded.L1, Loaded.M2, Loaded.L2) == (2, 1.5, 1, 0.5)
+        assert Loaded.dt == 0.01 and Loaded.T == 2
+        assert np.all(Loaded.y0 == Object.y0)
+        assert np.all(Loaded.t == Object.t)
+        assert np.all(Loaded.theta2 == Object.theta2)
+        assert np.all(Loaded.Kinetic == Object.Kinetic)
+        assert isinstance(Loaded.theta1, np.memmap) == mmap
+        assert "Kinetic" in Loaded._cache
+
+def test_load_wrong_class(tmp_path):
+    """
+    Tests weather loading a file with the wrong class raises ValueError,
+    and that derived quantities are computed if they were not saved.
+    """
+    path = tmp_path / "run.traj"
+    Object = DampenedPendulum(0.3, L=2)
+    Object.solve((1, 0), 1, 0.01)
+    Object.save(path)
+    Loaded = DampenedPendulum.load(path)
+    assert Loaded.B == 0.3
+    assert np.max(abs(Loaded.x - Object.x)) < 1e-14
+
+    success = False
+    try:
+        DoublePendulum.load(path)
+    except ValueError:
+        success = True
+    assert success
@@ -0,0 +1,130 @@
+import json
+import numpy as np
+
+#######################################
+"""
+Binary trajectory files for the pendulum models.
+
+Layout of a file:
+    8 bytes   magic b"PNDTRAJ1"
+    8 bytes   length of the header as a little endian uint64
+    header    JSON with the class name, the physical parameters,
+              dt, T, y0, the number of time points n and the column
+              names, padded with spaces so the data starts on a
+              multiple of 64 bytes
+    data      one column of n little endian float64 values after
+              the other, in the order of the column names
+
+Every column is contiguous, so reading a file with mmap=True
+gives np.memmap views without copying anything.
+"""
+######################################
+
+MAGIC = b"PNDTRAJ1"
+ALIGN = 64
+
+
+def write(path, header, columns):
+    """
+    Writes the dict header and the equally long 1D arrays in the
+    dict columns to path.
+    """
+    names = list(columns)
+    n = len(columns[names[0]])
+    header = dict(header, n=n, columns=names)
+    text = json.dumps(header).encode()
+    size = len(MAGIC) + 8 + len(text)
+    text += b" "*(-size % ALIGN)
+    with open(path, "wb") as outfile:
+        outfile.write(MAGIC)
+        outfile.write(np.uint64(len(text)).astype("<u8").tobytes())
+        outfile.write(text)
+        for name in names:
+            column = np.asarray(columns[name], dtype="<f8")
+            if len(column) != n:
+                print(f"Column '{name}' does not have length {n}")
+                raise ValueError
+            column.tofile(outfile)
+
+
+def read(path, mmap=True):
+    """
+    Reads a file written by write.
+    Returns (header, columns), where columns is a dict of 1D arrays.
+    With mmap=True the arrays are read only views of an np.memmap,
+    so nothing is loaded before it is used.
+    """
+    with open(path, "rb") as infile:
+        if infile.read(len(MAGIC)) != MAGIC:
+            print(f"{path} is not a trajectory file")
+            raise ValueError
+        length = int(np.frombuffer(infile.read(8), dtype="<u8")[0])
+        header = json.loads(infile.read(length))
+        offset = infile.tell()
+        shape = (len(header["columns"]), header["n"])
+        if mmap:
+            data = np.memmap(path, dtype="<f8", mode="r", offset=offset,
+                             shape=shape)
+        else:
+            data = np.fromfile(infile, dtype="<f8").reshape(shape)
+    columns = dict(zip(header["columns"], data))
+    return header, columns
+
+
+def save(model, path, derived=False):
+    """
+    Writes t and the solved state of a pendulum model to path, with the
+    parameters, dt, T and y0 in the header. With derived=True the
+    derived quantities in model._derived_names are stored as well.
+    """
+    names = ("t",) + model._state_names
+    if derived:
+        names += model._derived_names
+    columns = {name: getattr(model, name) for name in names}
+    header = {"class": type(model).__name__,
+              "parameters": model._parameters(),
+              "dt": model.dt,
+              "T": model.T,
+              "y0": [float(value) for value in model.y0]}
+    write(path, header, columns)
+
+
+def load(cls, path, mmap=True):
+    """
+    Creates a cls object from a file written by save, as if solve had
+    been called. Stored derived quantities go straight into the cache.
+    """
+    header, columns = read(path, mmap)
+    _check_class(header, cls, path)
+    model = cls(**header["parameters"])
+    _set_solution(model, header, columns)
+    return model
+
+
+def fill(model, path, mmap=True):
+    """
+    Puts the solution stored in path into an existing model,
+    as if solve had been called on it.
+    """
+    header, columns = read(path, mmap)
+    _check_class(header, type(model), path)
+    _set_solution(model, header, columns)
+
+
+def _check_class(header, cls, path):
+    if header["class"] != cls.__name__:
+        print(f"{path} holds a {header['class']}, not a {cls.__name__}")
+        raise ValueError
+
+
+def _set_solution(model, header, columns):
+    model.dt = header["dt"]
+    model.T = header["T"]
+    model.y0 = np.array(header["y0"])
+    model._t = columns["t"]
+    model._cache = {}
+    for name in model._state_names:
+        setattr(model, "_" + name, columns[name])
+    for name in model._derived_names:
+        if name in columns:
+            model._cache[name] = columns[name]
@@ -1,9 +1,10 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import numba
 import time
 import argparse
 import cProfile
+from concurrent.futures import ThreadPoolExecutor
+from scipy.signal import lfilter, lfiltic
 
 #######################################
 """
@@ -12,6 +13,103 @@ A program for a generalized chaos game
 """
 ######################################
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _njit(function):
+
+    """
+    numba.njit(cache=True, nogil=True) when numba is installed, else the
+    plain function. Without the GIL the chains of iterate run in parallel.
+    """
+
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+# ---------------------------------------------- Kernels ----------------------------------------------------- #
+
+@_njit
+def _iterate_kernel(start, corners, r, indices, discard, X_array):
+
+    """
+    Runs the chaos game from start with the pre-drawn corner indices.
+    The first discard steps are skipped and the rest are written to X_array.
+    """
+
+    x = start[0]
+    y = start[1]
+    for k in range(indices.shape[0]):
+        j = indices[k]
+        x = r*x + (1 - r)*corners[j, 0]
+        y = r*y + (1 - r)*corners[j, 1]
+        if k >= discard:
+            X_array[k - discard, 0] = x
+            X_array[k - discard, 1] = y
+
+
+@_njit
+def _color_kernel(start, corners, r, indices, discard, X_array, C):
+
+    """
+    Like _iterate_kernel, but also writes the running color average
+    C[k] = (C[k-1] + j_k)/2 of the corner indices, starting from 0.
+    """
+
+    x = start[0]
+    y = start[1]
+    c = 0.0
+    for k in range(indices.shape[0]):
+        j = indices[k]
+        x = r*x + (1 - r)*corners[j, 0]
+        y = r*y + (1 - r)*corners[j, 1]
+        if k >= discard:
+            c = (c + j)/2
+            X_array[k - discard, 0] = x
+            X_array[k - discard, 1] = y
+            C[k - discard] = c
+
+
+
+def _geometric_recurrence(table, indices, r, y0, out, block=2**16):
+
+    """
+    NumPy block engine for out[k] = r*out[k-1] + (1 - r)*table[indices[k]],
+    with out[-1] = y0. Returns the last value.
+
+    The recurrence is a first order IIR filter, which scipy.signal.lfilter
+    runs in C in O(n) for any r. The blocks bound the memory used for the
+    gathered table values, and the filter state carries y0 from one block
+    to the next.
+    """
+
+    b, a = [1 - r], [1, -r]
+    for start in range(0, len(indices), block):
+        values = table[indices[start:start + block]]
+        n = len(values)
+        out[start:start + n] = lfilter(b, a, values, zi=lfiltic(b, a, [y0]))[0]
+        y0 = out[start + n - 1]
+    return y0
+
+
+def _numpy_orbit(start, corners, r, indices, discard, X_array, C=None):
+
+    """The same orbit as _iterate_kernel and _color_kernel, with _geometric_recurrence"""
+
+    burn_in = np.empty(discard)
+    for i in range(2):
+        y0 = _geometric_recurrence(corners[:, i], indices[:discard], r, start[i], burn_in)
+        column = np.empty(len(X_array))
+        _geometric_recurrence(corners[:, i], indices[discard:], r, y0, column)
+        X_array[:, i] = column
+    if C is not None:
+        _geometric_recurrence(np.arange(len(corners), dtype=float), indices[discard:],
+                              0.5, 0.0, C)
+
 
 # --------------------------------------------- CLASS ChaosGame ---------------------------------------------- #
 
@@ -21,7 +119,7 @@ class ChaosGame:
 
     # --------------------- Private ------------------------------- #
 
-    def __init__(self, r=0.5, nGon=3):
+    def __init__(self, r=0.5, nGon=3, engine=None):
 
         """
         Init
@@ -38,6 +136,12 @@ class ChaosGame:
                 - must be more than 2
                 - must be int
 
+            engine:
+                - 'numba' runs the orbit in a compiled kernel
+                - 'numpy' runs it in blocks with scipy.signal.lfilter, for when
+                  numba is not installed
+                - defaults to 'numba' if numba is installed
+
         
         """
         if isinstance(r, float) and 0 < r and r < 1:
@@ -56,6 +160,16 @@ class ChaosGame:
             print("nGon must be of type 'int' and >= 1")
             raise TypeError
 
+        if engine is None:
+            engine = "numpy" if numba is None else "numba"
+        if engine not in ("numba", "numpy"):
+            print("engine must be 'numba' or 'numpy'")
+            raise ValueError
+        if engine == "numba" and numba is None:
+            print("numba is not installed, use engine='numpy'")
+            raise ImportError
+        self.engine = engine
+
         self.corners = self._generate_ngon()
 
     def _generate_ngon(self):
@@ -75,12 +189,20 @@ class ChaosGame:
 
         return corners
 
-    def _starting_point(self):
+    def _starting_point(self, rng=None):
+
+        """
+        Calculates starting values
 
-        """Calculates starting values"""
+        Parameters:
+
+            rng - np.random.Generator to draw from, defaults to np.random
+
+        """
 
         j = 0
-        y = np.random.dirichlet(np.ones(self.nGon), size=1)
+        rng = np.random if rng is None else rng
+        y = rng.dirichlet(np.ones(self.nGon), size=1)
         X = np.zeros(self.corners.shape)
         LinearCombo = np.zeros((1,2))
         for i in y[0]:
@@ -90,7 +212,7 @@ class ChaosGame:
 
         return LinearCombo
 
-    def _compute_color(self, steps, discard=5):
+    def _compute_color(self, steps, discard=5, workers=None, seed=None):
 
         """
         Calculates both points for array and color values
@@ -101,26 +223,83 @@ class ChaosGame:
 
             discard - number of points to skip
 
+            workers, seed - as in iterate
+
         """
 
-        X = self._starting_point()
-        for j in range(discard):
-            X = self.r * X + (1 - self.r) * self.corners[np.random.randint(0, self.nGon)]
+        X_array, C, corner_index = self._orbit(steps, discard, True, workers, seed)
+
+        return X_array, C
+
+    def _corner_indices(self, n, rng=None):
+
+        """
+        Draws n random corner indices at once, as uint8 when
+        there are few enough corners to save memory
+        """
+
+        dtype = np.uint8 if self.nGon <= 256 else np.intp
+        if rng is None:
+            return np.random.randint(0, self.nGon, size=n, dtype=dtype)
+        return rng.integers(0, self.nGon, size=n, dtype=dtype)
+
+    def _orbit(self, steps, discard, color, workers, seed):
+
+        """
+        Returns (X_array, C, corner_index), with C None unless color is True.
+
+        Without workers and seed this is one chain drawn from np.random.
+        Otherwise the points are split into workers chains, each with its
+        own stream from np.random.SeedSequence(seed).spawn, its own
+        starting point and its own discard steps. The chains run in
+        threads and write into disjoint slices of the same arrays.
+        """
 
         X_array = np.zeros((steps, 2))
-        C = np.zeros(steps)
-        for k in range(1, steps):
-            C_index = np.random.randint(0, self.nGon)
-            X = self.r * X + (1 - self.r) * self.corners[C_index]
-            X_array[k] = X
-            C[k] = (C[k-1] + C_index)/2
+        C = np.zeros(steps) if color else None
+        corner_index = np.empty(steps, dtype=np.uint8 if self.nGon <= 256 else np.intp)
 
-        return X_array, C
+        if workers is None and seed is None:
+            self._chain(None, discard, X_array, C, corner_index)
+            return X_array, C, corner_index
+
+        workers = 1 if workers is None else workers
+        if not isinstance(workers, int) or workers < 1:
+            print("workers must be of type 'int' and >= 1")
+            raise ValueError
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        streams = seed.spawn(workers)
+        bounds = np.linspace(0, steps, workers + 1).astype(int)
+
+        def run(i):
+            part = slice(bounds[i], bounds[i + 1])
+            self._chain(np.random.default_rng(streams[i]), discard, X_array[part],
+                        None if C is None else C[part], corner_index[part])
+
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(run, range(workers)))
+
+        return X_array, C, corner_index
+
+    def _chain(self, rng, discard, X_array, C, corner_index):
+
+        """Runs one chain of len(X_array) points and writes it into the given arrays"""
+
+        indices = self._corner_indices(discard + len(X_array), rng)
+        start = self._starting_point(rng)[0]
+        if self.engine == "numba" and C is None:
+            _iterate_kernel(start, self.corners, self.r, indices, discard, X_array)
+        elif self.engine == "numba":
+            _color_kernel(start, self.corners, self.r, indices, discard, X_array, C)
+        else:
+            _numpy_orbit(start, self.corners, self.r, indices, discard, X_array, C)
+        corner_index[:] = indices[discard:]
 
 
     # ---------------------------------- Public ------------------------------ #
 
-    def iterate(self, steps, discard=5):
+    def iterate(self, steps, discard=5, workers=None, seed=None):
 
         """
         Calulates points for array, without colors
@@ -131,22 +310,97 @@ class ChaosGame:
 
             discard - number of points to skip
 
+            workers - number of independent chains, run in parallel threads.
+                      The orbit forgets its starting point after a few dozen
+                      steps, so the chains together sample the same fractal.
+
+            seed - seed for np.random.SeedSequence, or a SeedSequence. With the
+                   same seed and workers the points are the same on every run.
+
+        If neither workers nor seed is given, one chain is drawn from np.random.
         """
-        X = self._starting_point()
-        for i in range(discard):
-            X = self.r * X + (1 - self.r) * self.corners[np.random.randint(0, self.nGon)]
 
-        X_array = np.zeros((steps, 2))
-        corner_index = np.zeros(steps)
-        for i in range(steps):
-            C_index = np.random.randint(0, self.nGon)
-            X = self.r * X + (1 - self.r) * self.corners[C_index]
-            X_array[i] = X
-            corner_index[i] = C_index
+        X_array, C, corner_index = self._orbit(steps, discard, False, workers, seed)
 
         return X_array, corner_index
 
-    def plot(self, color=False, cmap='jet', steps=10000, title='n-gon'):
+    def density(self, steps, resolution=1000, discard=5, block=2**22, workers=None, seed=None):
+
+        """
+        Accumulates points into a 2D histogram instead of keeping them
+
+        Parameters:
+
+            steps - number of points
+
+            resolution - number of pixels along each side
+
+            discard - number of points to skip in each block
+
+            block - number of points generated at a time, which bounds the memory use
+
+            workers, seed - as in iterate
+
+        Returns (counts, C_sum, extent), where counts is the number of points
+        in each pixel, C_sum the sum of their color values and extent the
+        (left, right, bottom, top) of the square, for imshow.
+        Row 0 is the bottom of the image.
+        """
+
+        lo = self.corners.min(axis=0)
+        span = np.max(self.corners.max(axis=0) - lo)
+        lo = lo - 0.5*(span - (self.corners.max(axis=0) - lo))
+        counts = np.zeros(resolution*resolution)
+        C_sum = np.zeros(resolution*resolution)
+        streams = None if seed is None else np.random.SeedSequence(seed).spawn(-(-steps // block))
+
+        for i, start in enumerate(range(0, steps, block)):
+            n = min(block, steps - start)
+            X_array, C, corner_index = self._orbit(
+                n, discard, True, workers, None if streams is None else streams[i])
+            pixel = ((X_array - lo)*(resolution/span)).astype(np.intp)
+            np.clip(pixel, 0, resolution - 1, out=pixel)
+            flat = pixel[:, 1]*resolution + pixel[:, 0]
+            counts += np.bincount(flat, minlength=resolution*resolution)
+            C_sum += np.bincount(flat, weights=C, minlength=resolution*resolution)
+
+        extent = (lo[0], lo[0] + span, lo[1], lo[1] + span)
+        shape = (resolution, resolution)
+        return counts.reshape(shape), C_sum.reshape(shape), extent
+
+    def raster(self, color=False, cmap='jet', steps=10000, resolution=1000, workers=None, seed=None):
+
+        """
+        Renders the fractal as an RGBA image with log density tone mapping
+
+        Parameters:
+
+            color - Whether to color the pixels by their mean color value or not
+
+            cmap - Type of color mapping
+
+            steps - number of points
+
+            resolution - number of pixels along each side
+
+            workers, seed - as in iterate
+
+        The opacity of a pixel is log(1 + count)/log(1 + max count), so the
+        time spent after the accumulation in density does not depend on steps.
+        Returns (image, extent), where image has shape (resolution, resolution, 4)
+        with row 0 at the bottom.
+        """
+
+        counts, C_sum, extent = self.density(steps, resolution, workers=workers, seed=seed)
+        image = np.zeros(counts.shape + (4,))
+        if color:
+            mean = np.divide(C_sum, counts, out=np.zeros_like(C_sum), where=counts > 0)
+            image[:] = plt.get_cmap(cmap)(mean/(self.nGon - 1))
+        image[..., 3] = np.log1p(counts)/np.log1p(max(counts.max(), 1))
+        return image, extent
+
+    def plot(self, color=False, cmap='jet', steps=10000, title='n-gon', raster=False,
+             resolution=1000, workers=None, seed=None):
 
         """
         Plots array
@@ -160,25 +414,40 @@ class ChaosGame:
             steps - number of points
 
             title - title for plot
+
+            raster - Whether to draw a density image with imshow instead of a scatter plot.
+                     Use this for more than about 10^6 points.
+
+            resolution - number of pixels along each side of the density image
+
+            workers, seed - as in iterate
         """
         
-        if color:
-            X_array, C = self._compute_color(steps)
-            plt.scatter(*zip(*X_array), s=0.1, marker='.', c=C, cmap=cmap)
+        if raster:
+            image, extent = self.raster(color, cmap, steps, resolution, workers, seed)
+            plt.imshow(image, origin='lower', extent=extent, interpolation='nearest')
+            plt.title(title)
+            plt.axis('equal')
+            plt.axis('off')
+
+        elif color:
+            X_array, C = self._compute_color(steps, workers=workers, seed=seed)
+            plt.scatter(X_array[:, 0], X_array[:, 1], s=0.1, marker='.', c=C, cmap=cmap)
             plt.title(title)
             plt.axis('equal')
             plt.axis('off')
             
             
         else:
-            X_array, corner_index = self.iterate(steps, 5)
-            plt.scatter(*zip(*X_array), s=0.1, marker='.', cmap=cmap)
+            X_array, corner_index = self.iterate(steps, 5, workers, seed)
+            plt.scatter(X_array[:, 0], X_array[:, 1], s=0.1, marker='.', cmap=cmap)
             plt.title(title)
             plt.axis('equal')
             plt.axis('off')
 
     
-    def show(self, color=False, cmap='jet', steps=10000, title='n-gon'):
+    def show(self, color=False, cmap='jet', steps=10000, title='n-gon', raster=False,
+             resolution=1000, workers=None, seed=None):
 
         """
         Plots array
@@ -192,12 +461,15 @@ class ChaosGame:
             steps - number of points
 
             title - title for plot
+
+            raster, resolution, workers, seed - as in plot
         """
         
-        self.plot(color, cmap, steps, title)
+        self.plot(color, cmap, steps, title, raster, resolution, workers, seed)
         plt.show()
 
-    def savepng(self, outfile, color=False, cmap='jet', steps=10000, title='n-gon'):
+    def savepng(self, outfile, color=False, cmap='jet', steps=10000, title='n-gon', raster=False,
+                resolution=1000, workers=None, seed=None):
 
         """
         Saves plot
@@ -212,15 +484,25 @@ class ChaosGame:
 
             steps - number of points
 
-            title - title for plot
+            title - title for plot, not used with raster=True
+
+            raster - Whether to write the density image from raster straight
+                     to outfile with imsave, one pixel per histogram bin
+
+            resolution, workers, seed - as in plot
         """
 
-        self.plot(color, cmap, steps, title)
+        if raster:
+            image, extent = self.raster(color, cmap, steps, resolution, workers, seed)
+            plt.imsave(outfile, image, origin='lower')
+            return
+
+        self.plot(color, cmap, steps, title, workers=workers, seed=seed)
         plt.savefig(outfile, dpi=300, transparent=True)
         plt.clf()
     
     
-    def get_color_array(self, steps):
+    def get_color_array(self, steps, workers=None, seed=None):
 
         """
         Returns point array and color array for further use of arrays
@@ -228,8 +510,10 @@ class ChaosGame:
         Parameters:
 
             steps - number of points
+
+            workers, seed - as in iterate
         """
-        X_array, C = self._compute_color(steps)
+        X_array, C = self._compute_color(steps, workers=workers, seed=seed)
 
         return X_array, C
 
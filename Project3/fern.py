@@ -4,6 +4,7 @@ from numba import jit
 import time
 import argparse
 import cProfile
+from ifs import IFS
 
 #############################
 """
@@ -30,26 +31,38 @@ class AffineTransform:
 
     
 
-    def __call__(self, vec=None, x=0, y=0):
+    def __call__(self, vec=None, x=0, y=0, out=None):
 
         """
         Magic method: __call__
 
         Parameters:
 
-            vec - x and y values as array or tuple
+            vec - x and y values as array or tuple, or an (N, 2) array of points
 
             x - x value
 
             y - y value
 
+            out - optional array to write the transformed points into
+
         
         Takes in the values of the variables in the function
         Calculates the Affine Transform
+        An (N, 2) array is transformed with one matrix product, pts @ matrix.T + vector
         """
 
         
-        if isinstance(vec, np.ndarray):
+        if isinstance(vec, np.ndarray) and vec.ndim == 2:
+            if vec.shape[1] != 2:
+                print("An array of points must have shape (N, 2)")
+                raise ValueError
+            # A float matrix keeps integer points from making an integer result
+            new_vec = np.matmul(vec, self.matrix.T.astype(float), out=out)
+            new_vec += self.vector
+            return new_vec
+
+        elif isinstance(vec, np.ndarray):
             new_vec = self.matrix.dot(vec) + self.vector
 
         elif isinstance(vec, tuple):
@@ -64,25 +77,42 @@ class AffineTransform:
             print("Vec must be an ndarray or tuple, or x and y must have float/int values")
             print(type(vec))
             raise TypeError
-        
-        
+
+        if out is not None:
+            out[...] = new_vec
+            return out
+
         return new_vec
 
+    def compose(self, other):
+
+        """
+        Returns the AffineTransform doing other first and then self,
+        so self.compose(other)(X) == self(other(X))
+
+        Parameters:
+
+            other - AffineTransform to apply first
+        """
+
+        matrix = self.matrix.dot(other.matrix)
+        vector = self.matrix.dot(other.vector) + self.vector
+        return AffineTransform(*matrix.ravel(), *vector)
 
 
-def func(X, functions):
+
+def barnsley_fern():
 
     """
-    Chooses a function through cumulative probability
-    Takes in an array and a list of functions
+    Returns an IFS with the functions and probabilities proposed by Barnsley Fern
     """
 
-    probability = [0.01, 0.85, 0.07, 0.07]
-    p_cumulative = np.cumsum(probability)
-    r = np.random.random()
-    for j, p in enumerate(p_cumulative):
-        if r < p:
-            return functions[j](X)
+    f1 = AffineTransform(0, 0, 0, 0.16, 0, 0)
+    f2 = AffineTransform(0.85, 0.04, -0.04, 0.85, 0, 1.6)
+    f3 = AffineTransform(0.20, -0.26, 0.23, 0.22, 0, 1.60)
+    f4 = AffineTransform(-0.15, 0.28, 0.26, 0.24, 0, 0.44)
+
+    return IFS([f1, f2, f3, f4], [0.01, 0.85, 0.07, 0.07])
 
 
 def main(iter, runtime=False):
@@ -99,29 +129,21 @@ def main(iter, runtime=False):
 
 
     Creates the functions proposed by Barnsley Fern
-    Loops through an array of points
+    Iterates them with the IFS engine from ifs.py
     Plots the array with scatter plot
     Calculates runtime of loops and plots
 
     """
 
-    f1 = AffineTransform(0, 0, 0, 0.16, 0, 0)
-    f2 = AffineTransform(0.85, 0.04, -0.04, 0.85, 0, 1.6)
-    f3 = AffineTransform(0.20, -0.26, 0.23, 0.22, 0, 1.60)
-    f4 = AffineTransform(-0.15, 0.28, 0.26, 0.24, 0, 0.44)
-
-    functions = [f1, f2, f3, f4]
-
-    X = np.zeros((iter, 2))
+    fern = barnsley_fern()
 
     x1 = time.time()
-    for i in range(1, iter):
-        X[i] = func(X[i-1], functions)
+    X, transform_index = fern.iterate(iter)
     x2 = time.time()
     
     
     x = time.time()
-    plt.scatter(*zip(*X), s=0.1, marker='.', c='green')
+    plt.scatter(X[:, 0], X[:, 1], s=0.1, marker='.', c='green')
     y = time.time()
     plt.title('Barnsley Fern - IFS')
     plt.axis('equal')
@@ -129,7 +151,7 @@ def main(iter, runtime=False):
     plt.savefig('barnsley_fern.png')
 
     
-    if args.Runtime == True:
+    if runtime == True:
         print(f"Runtime for {iter} iterations (Calculation): {x2-x1}")
         print(f"Runtime for {iter} iterations (Plotting): {y-x}")
         print(f"Runtime for {iter} iterations (Total): {(x2-x1) + (y-x)}")
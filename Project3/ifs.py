@@ -0,0 +1,351 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+#######################################
+"""
+A general engine for Iterated Function Systems
+
+All affine transforms are packed into one (k, 2, 2) array of matrices
+and one (k, 2) array of offsets. The transform indices are drawn in
+blocks with rng.choice, and the orbit runs in a compiled kernel.
+
+IFS.deterministic instead maps a whole occupancy grid through every
+transform each generation, which fills in rarely chosen transforms
+without needing huge numbers of points.
+"""
+######################################
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _njit(function):
+
+    """numba.njit(cache=True) when numba is installed, else the plain function"""
+
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+@_njit
+def _ifs_kernel(matrices, offsets, indices, x, y, skip, X_array):
+
+    """
+    Applies the transforms indices[k] one after the other, starting from (x, y).
+    The first skip points are not stored, point k >= skip goes to X_array[k - skip].
+    Returns the last point.
+    """
+
+    for k in range(indices.shape[0]):
+        j = indices[k]
+        x, y = (matrices[j, 0, 0]*x + matrices[j, 0, 1]*y + offsets[j, 0],
+                matrices[j, 1, 0]*x + matrices[j, 1, 1]*y + offsets[j, 1])
+        if k >= skip:
+            X_array[k - skip, 0] = x
+            X_array[k - skip, 1] = y
+    return x, y
+
+
+# ------------------------------------------------ CLASS IFS ------------------------------------------------- #
+
+class IFS:
+
+    """ Class for running the random iteration of an Iterated Function System """
+
+    def __init__(self, transforms, probabilities=None):
+
+        """
+        Init
+
+        Parameters:
+
+            transforms:
+                - list of AffineTransform
+
+            probabilities:
+                - probability of choosing each transform
+                - must have the same length as transforms and sum to 1
+                - defaults to determinant_probabilities(transforms)
+
+        """
+
+        if len(transforms) == 0:
+            print("transforms must hold at least one transform")
+            raise ValueError
+
+        self.transforms = list(transforms)
+        self.matrices = np.ascontiguousarray([t.matrix for t in transforms], dtype=float)
+        self.offsets = np.ascontiguousarray([t.vector for t in transforms], dtype=float)
+
+        if probabilities is None:
+            probabilities = self.determinant_probabilities(transforms)
+        probabilities = np.asarray(probabilities, dtype=float)
+        if probabilities.shape != (len(transforms),):
+            print("probabilities must have one value per transform")
+            raise ValueError
+        if np.any(probabilities < 0) or abs(probabilities.sum() - 1) > 1e-8:
+            print("probabilities must be non negative and sum to 1")
+            raise ValueError
+        self.probabilities = probabilities/probabilities.sum()
+
+    @staticmethod
+    def determinant_probabilities(transforms, floor=0.01):
+
+        """
+        Returns probabilities proportional to |det| of the transform matrices
+
+        Parameters:
+
+            transforms - list of AffineTransform
+
+            floor - smallest probability given to any transform, at most
+                    1/len(transforms)
+
+        A transform shrinks areas by |det|, so choosing it with probability
+        proportional to |det| spreads the points evenly over the attractor.
+        Singular maps like the stem of the Barnsley fern have det = 0 but
+        still draw a line, so transforms that would get less than floor get
+        exactly floor, and the rest share what is left in proportion to
+        |det|. With floor=0.01 the fern stem gets Barnsley's 1%.
+        If every map is singular, all get the same probability.
+        """
+
+        determinants = np.abs([np.linalg.det(t.matrix) for t in transforms])
+        k = len(transforms)
+        if floor*k > 1 + 1e-12:
+            print("floor can be at most 1/len(transforms)")
+            raise ValueError
+        if determinants.sum() == 0:
+            return np.full(k, 1/k)
+
+        # Raising a transform to floor leaves less for the others,
+        # which can push more of them below floor
+        low = np.zeros(k, dtype=bool)
+        while True:
+            probabilities = np.full(k, float(floor))
+            free = ~low
+            if not free.any():
+                return probabilities/probabilities.sum()
+            probabilities[free] = (1 - floor*low.sum())*determinants[free]/determinants[free].sum()
+            below = free & (probabilities < floor)
+            if not below.any():
+                return probabilities
+            low |= below
+
+    def iterate(self, steps, discard=5, seed=None, block=2**22):
+
+        """
+        Calculates points on the attractor by random iteration from (0, 0)
+
+        Parameters:
+
+            steps - number of points
+
+            discard - number of points to skip
+
+            seed - seed or np.random.Generator for the transform indices
+
+            block - number of indices drawn at a time, which bounds the
+                    memory used for them
+
+        Returns (X_array, transform_index), where X_array has shape (steps, 2)
+        and transform_index holds the transform used for each point.
+        """
+
+        rng = np.random.default_rng(seed)
+        k = len(self.transforms)
+        dtype = np.uint8 if k <= 256 else np.intp
+        X_array = np.zeros((steps, 2))
+        transform_index = np.empty(steps, dtype=dtype)
+
+        x, y = 0.0, 0.0
+        total = discard + steps
+        for start in range(0, total, block):
+            n = min(block, total - start)
+            indices = rng.choice(k, size=n, p=self.probabilities).astype(dtype)
+            skip = min(n, max(0, discard - start))
+            first = max(0, start - discard)
+            x, y = _ifs_kernel(self.matrices, self.offsets, indices, x, y, skip,
+                               X_array[first:first + n - skip])
+            if skip < n:
+                transform_index[first:first + n - skip] = indices[skip:]
+
+        return X_array, transform_index
+
+    def deterministic(self, resolution=512, generations=None, extent=None):
+
+        """
+        Renders the attractor with the deterministic algorithm on a raster
+
+        Parameters:
+
+            resolution - number of pixels along each side
+
+            generations - maximal number of generations. Defaults to the number
+                          needed for the largest transform to shrink the whole
+                          image below one pixel.
+
+            extent - (left, right, bottom, top) of the image. Defaults to the
+                     bounding box of 10^5 points from iterate, padded by 2%.
+
+        Starts from a grid with every pixel occupied. Each generation maps the
+        centers of the occupied pixels through every transform with one batch
+        call each, and the pixels they land in make up the next grid. The grid
+        shrinks towards the attractor and stops when it no longer changes.
+        Mapping only the centers misses a few percent of the pixels random
+        iteration reaches and adds about as many, while mapping the pixel
+        corners misses none but thickens the whole image.
+        Memory depends on the resolution only, not on the number of generations.
+
+        Returns (grid, extent), where grid is a (resolution, resolution) bool
+        array with row 0 at the bottom.
+        """
+
+        if extent is None:
+            X_array, transform_index = self.iterate(100000, seed=0)
+            lo = X_array.min(axis=0)
+            hi = X_array.max(axis=0)
+            pad = 0.02*np.maximum(hi - lo, 1e-12)
+            extent = (lo[0] - pad[0], hi[0] + pad[0], lo[1] - pad[1], hi[1] + pad[1])
+        lo = np.array([extent[0], extent[2]])
+        size = np.array([extent[1] - extent[0], extent[3] - extent[2]])/resolution
+
+        if generations is None:
+            contraction = max(np.linalg.norm(self.matrices, ord=2, axis=(1, 2)).max(), 1e-12)
+            if contraction >= 1:
+                print("The transforms must be contractions to pick generations automatically")
+                raise ValueError
+            generations = int(np.ceil(np.log(1/resolution)/np.log(contraction))) + 1
+
+        # fern.py imports this module, so AffineTransform is imported here
+        from fern import AffineTransform
+
+        # The transforms conjugated to pixel coordinates, so pixel centers
+        # map straight to pixel coordinates with one batch call each
+        to_world = AffineTransform(size[0], 0, 0, size[1], lo[0], lo[1])
+        to_pixel = AffineTransform(1/size[0], 0, 0, 1/size[1],
+                                   -lo[0]/size[0], -lo[1]/size[1])
+        pixel_transforms = [to_pixel.compose(t.compose(to_world)) for t in self.transforms]
+
+        grid = np.ones((resolution, resolution), dtype=bool)
+        for generation in range(generations):
+            row, column = np.nonzero(grid)
+            points = np.column_stack((column, row)) + 0.5
+            image = np.empty_like(points)
+            new_grid = np.zeros(resolution*resolution, dtype=bool)
+            for transform in pixel_transforms:
+                transform(points, out=image)
+                # Shifting by 1 makes the truncation of astype a floor for
+                # everything that can land on the grid, and negative pixels
+                # wrap around to huge unsigned values outside it
+                image += 1
+                pixel = image.astype(np.intp).view(np.uintp) - 1
+                x, y = pixel[:, 0], pixel[:, 1]
+                inside = (x < resolution) & (y < resolution)
+                new_grid[y[inside]*resolution + x[inside]] = True
+            new_grid = new_grid.reshape(grid.shape)
+            if np.array_equal(new_grid, grid):
+                break
+            grid = new_grid
+
+        return grid, extent
+
+    def coverage(self, target=0.9, resolution=256, block=10000, max_steps=10**8, seed=None):
+
+        """
+        Counts the random iteration points needed to fill the attractor
+
+        Parameters:
+
+            target - fraction of the pixels of deterministic(resolution) to reach
+
+            resolution - number of pixels along each side
+
+            block - number of points added at a time, which is the precision
+                    of the returned count
+
+            max_steps - number of points to give up after
+
+            seed - as in iterate
+
+        Returns the number of points after which at least target of the pixels
+        in the deterministic image have been hit, or None if max_steps points
+        were not enough.
+        """
+
+        reference, extent = self.deterministic(resolution)
+        lo = np.array([extent[0], extent[2]])
+        size = np.array([extent[1] - extent[0], extent[3] - extent[2]])/resolution
+        needed = target*reference.sum()
+        hit = np.zeros(resolution*resolution, dtype=bool)
+        rng = np.random.default_rng(seed)
+
+        steps = 0
+        while steps < max_steps:
+            X_array, transform_index = self.iterate(block, seed=rng)
+            pixel = np.floor((X_array - lo)/size).astype(np.intp)
+            inside = np.all((pixel >= 0) & (pixel < resolution), axis=1)
+            hit[pixel[inside, 1]*resolution + pixel[inside, 0]] = True
+            steps += block
+            if np.count_nonzero(hit & reference.ravel()) >= needed:
+                return steps
+        return None
+
+    def plot(self, steps=100000, color='green', title='IFS', seed=None,
+             deterministic=False, resolution=512):
+
+        """
+        Plots the attractor
+
+        Parameters:
+
+            steps - number of points
+
+            color - color of the points
+
+            title - title for plot
+
+            seed - as in iterate
+
+            deterministic - Whether to draw the grid from deterministic with
+                            imshow instead of a scatter plot of random points
+
+            resolution - as in deterministic
+        """
+
+        if deterministic:
+            grid, extent = self.deterministic(resolution)
+            image = np.zeros(grid.shape + (4,))
+            image[grid] = plt.matplotlib.colors.to_rgba(color)
+            plt.imshow(image, origin='lower', extent=extent, interpolation='nearest')
+        else:
+            X_array, transform_index = self.iterate(steps, seed=seed)
+            plt.scatter(X_array[:, 0], X_array[:, 1], s=0.1, marker='.', c=color)
+        plt.title(title)
+        plt.axis('equal')
+        plt.axis('off')
+
+
+def coverage_benchmark(target=0.9, resolution=256):
+
+    """
+    Compares how many points the Barnsley fern needs to fill target of its
+    pixels with Barnsley's probabilities and with determinant_probabilities
+    """
+
+    from fern import barnsley_fern
+
+    fixed = barnsley_fern()
+    adaptive = IFS(fixed.transforms)
+    for name, system in (("Barnsley", fixed), ("Determinant", adaptive)):
+        steps = system.coverage(target, resolution, seed=0)
+        print(f"{name} probabilities {np.round(system.probabilities, 3)}: "
+              f"{steps} points for {target:.0%} of {resolution}x{resolution} pixels")
+
+
+if __name__ == "__main__":
+
+    coverage_benchmark()
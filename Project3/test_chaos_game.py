@@ -41,3 +41,89 @@ def test_ngon_boundaries():
 
 
 
+
+def test_iterate_matches_recurrence():
+
+    testObj = ChaosGame(r=1/3, nGon=5)
+    np.random.seed(1)
+    X_array, corner_index = testObj.iterate(1000, discard=10)
+    assert X_array.shape == (1000, 2)
+    assert len(corner_index) == 1000
+    for k in range(1, 1000):
+        expected = testObj.r*X_array[k-1] + (1 - testObj.r)*testObj.corners[corner_index[k]]
+        assert np.allclose(X_array[k], expected)
+
+def test_compute_color():
+
+    testObj = ChaosGame(r=1/2, nGon=3)
+    np.random.seed(2)
+    X_array, C = testObj._compute_color(1000)
+    np.random.seed(2)
+    X_iter, corner_index = testObj.iterate(1000)
+    assert np.array_equal(X_array, X_iter)
+    expected = 0
+    for k in range(1000):
+        expected = (expected + corner_index[k])/2
+        assert abs(C[k] - expected) < 1e-14
+
+def test_numpy_engine():
+
+    for r, nGon in ((1/2, 3), (1/3, 5), (0.9, 4), (0.999, 6)):
+        numbaObj = ChaosGame(r=r, nGon=nGon, engine='numba')
+        numpyObj = ChaosGame(r=r, nGon=nGon, engine='numpy')
+        np.random.seed(3)
+        expected, C_expected = numbaObj._compute_color(200000)
+        np.random.seed(3)
+        computed, C_computed = numpyObj._compute_color(200000)
+        assert np.max(abs(expected - computed)) < 1e-12
+        assert np.max(abs(C_expected - C_computed)) < 1e-12
+
+def test_init_engine():
+
+    success = False
+
+    try:
+        testObj = ChaosGame(engine='fortran')
+    except ValueError:
+        success = True
+    assert success
+
+def test_parallel_chains():
+
+    testObj = ChaosGame(r=1/3, nGon=5)
+    X_array, corner_index = testObj.iterate(100000, workers=4, seed=42)
+    X_again, index_again = testObj.iterate(100000, workers=4, seed=42)
+    assert np.array_equal(X_array, X_again)
+    assert np.array_equal(corner_index, index_again)
+    X_other, index_other = testObj.iterate(100000, workers=4, seed=43)
+    assert not np.array_equal(X_array, X_other)
+
+    # Every chain follows the recurrence, apart from where the chains meet
+    expected = testObj.r*X_array[:-1] + (1 - testObj.r)*testObj.corners[corner_index[1:]]
+    wrong = np.flatnonzero(np.any(abs(X_array[1:] - expected) > 1e-12, axis=1))
+    assert np.array_equal(wrong + 1, [25000, 50000, 75000])
+
+    numpyObj = ChaosGame(r=1/3, nGon=5, engine='numpy')
+    X_numpy, C_numpy = numpyObj._compute_color(100000, workers=4, seed=42)
+    assert np.max(abs(X_numpy - X_array)) < 1e-12
+
+def test_density():
+
+    testObj = ChaosGame(r=1/2, nGon=3)
+    counts, C_sum, extent = testObj.density(100000, resolution=64, block=30000, seed=1)
+    assert counts.shape == C_sum.shape == (64, 64)
+    assert counts.sum() == 100000
+    assert np.all(C_sum <= 2*counts)
+    again = testObj.density(100000, resolution=64, block=30000, seed=1)
+    assert np.array_equal(counts, again[0])
+
+    # The same as a histogram of the points themselves
+    X_array, C = testObj._compute_color(30000, seed=np.random.SeedSequence(1).spawn(4)[0])
+    expected, xedges, yedges = np.histogram2d(X_array[:, 1], X_array[:, 0], bins=64,
+                                              range=[extent[2:], extent[:2]])
+    first = testObj.density(30000, resolution=64, block=30000, seed=1)[0]
+    assert np.abs(expected - first).sum() <= 10
+
+    image, extent = testObj.raster(True, steps=10000, resolution=32)
+    assert image.shape == (32, 32, 4)
+    assert image[..., 3].max() == 1
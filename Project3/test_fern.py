@@ -0,0 +1,43 @@
+import numpy as np
+from fern import AffineTransform
+
+def test_call():
+
+    f = AffineTransform(0.85, 0.04, -0.04, 0.85, 0, 1.6)
+    expected = np.array([0.85*1 + 0.04*2, -0.04*1 + 0.85*2 + 1.6])
+    assert np.allclose(f(np.array([1, 2])), expected)
+    assert np.allclose(f((1, 2)), expected)
+    assert np.allclose(f(x=1, y=2), expected)
+
+def test_call_points():
+
+    f = AffineTransform(0.20, -0.26, 0.23, 0.22, 0, 1.60)
+    points = np.random.default_rng(0).normal(size=(100, 2))
+    expected = np.array([f(point) for point in points])
+    assert np.allclose(f(points), expected)
+
+    out = np.empty((100, 2))
+    computed = f(points, out=out)
+    assert computed is out
+    assert np.allclose(out, expected)
+
+    shift = AffineTransform(1, 0, 0, 1, 0.5, 0)
+    assert np.allclose(shift(np.array([[1, 2], [3, 4]])), [[1.5, 2], [3.5, 4]])
+    point = np.empty(2)
+    assert shift(np.array([1, 2]), out=point) is point
+    assert np.allclose(point, [1.5, 2])
+
+    success = False
+    try:
+        f(np.zeros((4, 3)))
+    except ValueError:
+        success = True
+    assert success
+
+def test_compose():
+
+    f = AffineTransform(0.85, 0.04, -0.04, 0.85, 0, 1.6)
+    g = AffineTransform(-0.15, 0.28, 0.26, 0.24, 0, 0.44)
+    points = np.random.default_rng(1).normal(size=(10, 2))
+    assert np.allclose(f.compose(g)(points), f(g(points)))
+    assert np.allclose(g.compose(f)(points), g(f(points)))
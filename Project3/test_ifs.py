@@ -0,0 +1,99 @@
+import numpy as np
+from ifs import IFS
+from fern import AffineTransform, barnsley_fern
+
+def test_iterate_matches_transforms():
+
+    fern = barnsley_fern()
+    X_array, transform_index = fern.iterate(10000, discard=7, seed=1, block=1000)
+    assert X_array.shape == (10000, 2)
+    for k in range(1, 10000):
+        expected = fern.transforms[transform_index[k]](X_array[k-1])
+        assert np.allclose(X_array[k], expected)
+
+    X_again, index_again = fern.iterate(10000, discard=7, seed=1, block=1000)
+    assert np.array_equal(X_array, X_again)
+
+def test_iterate_small_blocks():
+
+    fern = barnsley_fern()
+    X_array, transform_index = fern.iterate(100, discard=10, seed=4, block=4)
+    X_once, index_once = fern.iterate(100, discard=10, seed=4, block=1000)
+    assert np.allclose(X_array, X_once)
+    assert np.array_equal(transform_index, index_once)
+    assert fern.coverage(0.1, resolution=16, block=3, seed=5) is not None
+
+def test_probabilities():
+
+    fern = barnsley_fern()
+    X_array, transform_index = fern.iterate(100000, seed=2)
+    frequency = np.bincount(transform_index, minlength=4)/100000
+    assert np.allclose(frequency, [0.01, 0.85, 0.07, 0.07], atol=0.01)
+
+    success = False
+    try:
+        IFS(fern.transforms, [0.5, 0.5])
+    except ValueError:
+        success = True
+    assert success
+
+def test_default_probabilities():
+
+    halves = [AffineTransform(0.5, 0, 0, 0.5, 0, 0), AffineTransform(0.5, 0, 0, 0.5, 0.5, 0)]
+    testObj = IFS(halves)
+    assert np.allclose(testObj.probabilities, [0.5, 0.5])
+    X_array, transform_index = testObj.iterate(1000, seed=3)
+    assert np.all((X_array[:, 0] >= 0) & (X_array[:, 0] <= 1))
+    assert np.allclose(X_array[:, 1], 0)
+
+def test_deterministic_square():
+
+    quarters = [AffineTransform(0.5, 0, 0, 0.5, e, f) for e in (0, 0.5) for f in (0, 0.5)]
+    grid, extent = IFS(quarters).deterministic(64, extent=(0, 1, 0, 1))
+    assert grid.shape == (64, 64)
+    assert np.all(grid)
+
+def test_deterministic_covers_random_iteration():
+
+    fern = barnsley_fern()
+    grid, extent = fern.deterministic(128)
+    X_array, transform_index = fern.iterate(200000, seed=4)
+    counts, xedges, yedges = np.histogram2d(X_array[:, 1], X_array[:, 0], bins=128,
+                                            range=[extent[2:], extent[:2]])
+    visited = counts > 0
+    assert (visited & ~grid).sum() < 0.05*visited.sum()
+    assert grid.sum() < 1.1*visited.sum()
+
+def test_determinant_probabilities():
+
+    fern = barnsley_fern()
+    probabilities = IFS.determinant_probabilities(fern.transforms)
+    determinants = np.abs([np.linalg.det(t.matrix) for t in fern.transforms])
+    assert abs(probabilities.sum() - 1) < 1e-14
+    assert abs(probabilities[0] - 0.01) < 1e-14
+    assert np.allclose(probabilities[1:]/probabilities[1], determinants[1:]/determinants[1])
+    assert np.allclose(IFS(fern.transforms).probabilities, probabilities)
+
+    lines = [AffineTransform(0.5, 0, 0, 0, 0, 0), AffineTransform(0.5, 0, 0, 0, 0.5, 0)]
+    assert np.allclose(IFS.determinant_probabilities(lines), [0.5, 0.5])
+
+    maps = [AffineTransform(a, 0, 0, a, 0, 0) for a in (0.9, 0.3, 0.2, 0)]
+    probabilities = IFS.determinant_probabilities(maps, floor=0.1)
+    assert abs(probabilities.sum() - 1) < 1e-14
+    assert np.allclose(probabilities, [0.7, 0.1, 0.1, 0.1])
+    probabilities = IFS.determinant_probabilities(maps, floor=0.25)
+    assert np.allclose(probabilities, 0.25)
+
+    success = False
+    try:
+        IFS.determinant_probabilities(maps, floor=0.3)
+    except ValueError:
+        success = True
+    assert success
+
+def test_coverage():
+
+    fern = barnsley_fern()
+    steps = fern.coverage(0.8, resolution=64, block=1000, seed=5)
+    assert steps is not None and steps % 1000 == 0
+    assert fern.coverage(0.8, resolution=64, block=1000, max_steps=1000, seed=5) is None
@@ -0,0 +1,52 @@
+import numpy as np
+from triangle import Triangle
+
+def make_triangle():
+
+    corners = np.array([[0, 0], [1, 0], [0.5, 0.866]])
+    return Triangle(3, corners)
+
+def test_corner_points():
+
+    testObj = make_triangle()
+    X_array, corner_index = testObj.corner_points(1000)
+    assert X_array.shape == (1000, 2)
+    for i in range(1, 1000):
+        expected = (X_array[i-1] + testObj.corners[corner_index[i]])/2
+        assert np.allclose(X_array[i], expected)
+
+def test_corner_points_many_corners():
+
+    angles = 2*np.pi*np.arange(300)/300
+    testObj = Triangle(300, np.column_stack((np.cos(angles), np.sin(angles))))
+    np.random.seed(0)
+    X_array, corner_index = testObj.corner_points(5000)
+    assert corner_index.max() >= 256
+    for i in range(1, 5000):
+        expected = (X_array[i-1] + testObj.corners[corner_index[i]])/2
+        assert np.allclose(X_array[i], expected)
+    assert testObj.rgb_colors(corner_index).shape == (5000, 3)
+
+def test_color_iteration():
+
+    testObj = make_triangle()
+    X_array, color_array = testObj.color_iteration(1000, plot=False)
+    assert X_array.shape == (1000, 2)
+    assert set(np.unique(color_array)) <= {0, 1, 2}
+    colors = testObj.rgb_colors(color_array)
+    assert colors.shape == (1000, 3)
+    assert np.all(colors[color_array == 0] == (1, 0, 0))
+
+def test_alternative_color():
+
+    testObj = make_triangle()
+    np.random.seed(4)
+    X_array, C = testObj.alternative_color(1000, plot=False)
+    np.random.seed(4)
+    X_points, corner_index = testObj.corner_points(1000)
+    assert np.array_equal(X_array, X_points)
+    assert C.shape == (1000, 3)
+    expected = np.zeros(3)
+    for i in range(1000):
+        expected = (expected + np.eye(3)[corner_index[i]])/2
+        assert np.allclose(C[i], expected)
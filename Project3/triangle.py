@@ -1,5 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgb
+from scipy.signal import lfilter, lfiltic
 import numba
 import time
 import argparse
@@ -40,6 +42,50 @@ class Triangle:
 
         return LinearCombo
 
+    def corner_points(self, iter, discard=5):
+        """
+
+        Method: corner_points
+
+        Parameters:
+
+            iter - Number of points/iterations
+
+            discard - Number of points to skip
+
+        Draws all corner indices j at once and computes Xi+1 = (Xi + Cj) / 2
+        for both coordinates with scipy.signal.lfilter, starting from random_points()
+        Returns (X_array, corner_index), where corner_index is a uint8 array
+        for at most 256 corners
+
+        """
+        dtype = np.uint8 if self.gonSize <= 256 else np.intp
+        corner_index = np.random.randint(0, self.gonSize, size=discard + iter, dtype=dtype)
+        X = self.random_points()[0]
+        X_array = np.empty((iter, 2))
+        for i in range(2):
+            X_array[:, i] = _halving_filter(self.corners[corner_index, i], X[i])[discard:]
+
+        return X_array, corner_index[discard:]
+
+    def rgb_colors(self, corner_index):
+        """
+
+        Method: rgb_colors
+
+        Parameters:
+
+            corner_index - corner index of each point, from corner_points
+
+        Returns the RGB color of each point's corner as a float (N, 3) array.
+        Corner 0, 1 and 2 are red, blue and green, any further corners
+        take their colors from the tab10 color map.
+
+        """
+        palette = np.array([to_rgb(color) for color in ('red', 'blue', 'green')]
+                           + [plt.get_cmap('tab10')(i % 10)[:3] for i in range(max(0, self.gonSize - 3))])
+        return palette[corner_index]
+
     def iteration(self, iter, plot=True, runtime=False):
         """
 
@@ -111,45 +157,21 @@ class Triangle:
 
             runtime - print out runtime of iterations and plotting
 
-        Method calls random_points() method to get a start value
-        Loops through array and uses the formula Xi+1 = (Xi + Cj) / 2
-        Here Cj is a random choosen corner, where each corner has a color added to a color list
-        Method skips the first 5 values and then starts to add values to an array
-        If plot=True, then the method plots the array with the plt.scatter(), with c=color_list
+        Method calls corner_points() to get the points and the corner index of each point
+        Each point gets the RGB color of its corner from rgb_colors()
+        Method skips the first 5 values
+        If plot=True, then the method plots the array with the plt.scatter(), with c as a float (N, 3) array
+        Otherwise returns the points and the corner indices
 
         """
-        
-        X = self.random_points()
-
-        for i in range(5):
-            X = (X + self.corners[np.random.randint(0, self.gonSize)])/2
-
-        X_array = np.zeros((iter, 2))
-        color_array = np.zeros(iter)
-        color_list = []
 
         x = time.time()
-
-        for i in range(iter):
-            rand_index = np.random.randint(0, self.gonSize)
-            X = (X + self.corners[rand_index])/2
-            X_array[i] = X
-            color_array[i] = rand_index
-
-            if rand_index == 0:
-                color_list.append('red')
-
-            elif rand_index == 1:
-                color_list.append('blue')
-
-            elif rand_index == 2:
-                color_list.append('green')
-
+        X_array, color_array = self.corner_points(iter)
         y = time.time()
 
         if plot == True:
             x1 = time.time()
-            plt.scatter(*zip(*X_array), c=color_list, s=0.1, marker='.')
+            plt.scatter(X_array[:, 0], X_array[:, 1], c=self.rgb_colors(color_array), s=0.1, marker='.')
             x2 = time.time()
             plt.title('Color List - Sierpinski Triangle')
             plt.axis('equal')
@@ -165,8 +187,6 @@ class Triangle:
 
             if runtime == True:
                 print("Runtime for {} iterations (Calculations): {}".format(iter, y-x))
-                print("Runtime for {} iterations (Plotting): {}".format(iter, x2-x1))
-                print("Runtime for {} iterations (Total): {}".format(iter, (y-x) + (x2-x1)))
 
             return X_array, color_array
 
@@ -183,41 +203,25 @@ class Triangle:
 
             runtime - print out runtime of iterations and plotting
         
-        Method calls random_points() method to get a start value
-        Loops through array and uses the formula Xi+1 = (Xi + Cj) / 2
-        Here Cj is a random choosen corner.
-        Method skips the first 5 values and then starts to add values to an array
+        Method calls corner_points() to get the points and the corner index of each point
+        Method skips the first 5 values
+        Calculates a RGB color array with Ci = (Ci-1 + r_j) / 2, where r_j is the unit vector
+        of the chosen corner and C starts at black, with scipy.signal.lfilter
         If plot=True, then the method plots the array with the plt.scatter()
-        Calculates a RGB color array, which is plotted with the plt.scatter()
+        Otherwise returns the points and the float (N, 3) color array
 
         """
 
-        C = np.zeros((iter, 3))
-        r_1 = np.array([1, 0, 0])
-        r_2 = np.array([0, 1, 0])
-        r_3 = np.array([0, 0, 1])
-        r_j = [r_1, r_2, r_3]
-
-        X = self.random_points()
-
-        for i in range(5):
-            X = (X + self.corners[np.random.randint(0, self.gonSize)])/2
-
-        X_array = np.zeros((iter, 2))
-
         x = time.time()
-
-        for i in range(1, iter):
-            rand_index = np.random.randint(0, self.gonSize)
-            X = (X + self.corners[rand_index])/2
-            X_array[i-1] = X
-            C[i] = (C[i-1] + r_j[rand_index])/2
-
+        X_array, corner_index = self.corner_points(iter)
+        C = np.empty((iter, 3))
+        for i in range(3):
+            C[:, i] = _halving_filter(corner_index == i, 0)
         y = time.time()
 
         if plot == True:
             x1 = time.time()
-            plt.scatter(*zip(*X_array), c=C, s=0.1, marker='.')
+            plt.scatter(X_array[:, 0], X_array[:, 1], c=C, s=0.1, marker='.')
             x2 = time.time()
             plt.title('RGB Color Array - Sierpinski Triangle')
             plt.axis('equal')
@@ -233,10 +237,8 @@ class Triangle:
 
             if runtime == True:
                 print("Runtime for {} iterations (Calculations): {}".format(iter, y-x))
-                print("Runtime for {} iterations (Plotting): {}".format(iter, x2-x1))
-                print("Runtime for {} iterations (Total): {}".format(iter, (y-x) + (x2-x1)))
 
-            return X_array, color_array
+            return X_array, C
 
     def plot_bouderies(self):
         """
@@ -250,6 +252,16 @@ class Triangle:
 
 # -------------------------------------------- OUTSIDE CLASS ------------------------------------------------ #
 
+def _halving_filter(values, start):
+    """
+    Returns y with y[i] = (y[i-1] + values[i]) / 2 and y[-1] = start,
+    computed in C by scipy.signal.lfilter instead of a Python loop
+    """
+    b, a = [0.5], [1, -0.5]
+    zi = lfiltic(b, a, [start])
+    return lfilter(b, a, values, zi=zi)[0]
+
+
 
 
 if __name__ == "__main__":
@@ -5,7 +5,7 @@ import time
 import argparse
 import cProfile
 from chaos_game import ChaosGame
-from fern import AffineTransform
+from fern import barnsley_fern
 import sys
 from matplotlib.animation import FuncAnimation
 
@@ -219,7 +219,7 @@ def fern(f, steps=10000, plot=True):
 
     """
     Creates a plot of the Barnsley Fern.
-    Uses the class AffineTransform from fern.py
+    Uses barnsley_fern from fern.py
 
     Parameters:
 
@@ -229,24 +229,7 @@ def fern(f, steps=10000, plot=True):
 
         plot - Whether to plot or not. If set to False, returns array
     """
-    f1 = AffineTransform(0, 0, 0, 0.16, 0, 0)
-    f2 = AffineTransform(0.85, 0.04, -0.04, 0.85, 0, 1.6)
-    f3 = AffineTransform(0.20, -0.26, 0.23, 0.22, 0, 1.60)
-    f4 = AffineTransform(-0.15, 0.28, 0.26, 0.24, 0, 0.44)
-
-    def func(X, functions):
-        probability = [0.01, 0.85, 0.07, 0.07]
-        p_cumulative = np.cumsum(probability)
-        r = np.random.random()
-        for j, p in enumerate(p_cumulative):
-            if r < p:
-                return functions[j](X)
-
-
-    X = np.zeros((steps, 2))
-    functions = [f1, f2, f3, f4]
-    for i in range(1, steps):
-        X[i] = func(X[i-1], functions)
+    X, transform_index = barnsley_fern().iterate(steps)
 
     new_obj = Variations(arr=X, colors='green', scale=True)
 